@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Throughput benchmarks for the generator and loader scripts.
+
+Every case runs in a fresh subprocess so peak RSS is measured per case.
+Results (rows/sec, peak RSS, output bytes) are written to a JSON file and can
+be compared against a stored baseline:
+
+    python3 benchmark.py --output bench.json
+    python3 benchmark.py --baseline bench.json --threshold 0.15
+
+Comparison exits with status 1 when a case got slower, or used more memory,
+by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+
+def _write_archive(path: str, rows: int) -> None:
+    from events_archive import EventsArchiveGenerator, write_events
+    events = EventsArchiveGenerator().iter_events_parallel(rows, seed=1, workers=1)
+    write_events(events, path, "jsonl")
+
+# Times generation too: write_events consumes iter_events_parallel lazily
+def bench_write_events(rows: int, work_dir: str) -> str:
+    path = os.path.join(work_dir, "events_archive.jsonl")
+    _write_archive(path, rows)
+    return path
+
+def bench_users_csv(rows: int, work_dir: str) -> str:
+    import generate_ticket_users
+    path = os.path.join(work_dir, "users.csv")
+    generate_ticket_users.run_pipeline([generate_ticket_users.CsvSink(path)], num_users=rows)
+    return path
+
+def bench_generate_events(rows: int, work_dir: str) -> str:
+    import generate_events
+    events = generate_events.generate_events(count=rows)
+    path = os.path.join(work_dir, "events.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(events, f, ensure_ascii=False, indent=2)
+    return path
+
+def setup_insert_statements(rows: int, work_dir: str) -> None:
+    _write_archive(os.path.join(work_dir, "input.jsonl"), rows)
+
+def bench_insert_statements(rows: int, work_dir: str) -> str:
+    from insert_events_from_json import generate_insert_statements, iter_events
+    path = os.path.join(work_dir, "insert.sql")
+    with open(path, "w", encoding="utf-8") as f, contextlib.redirect_stdout(f):
+        generate_insert_statements(iter_events(os.path.join(work_dir, "input.jsonl")))
+    return path
+
+# name -> (untimed setup or None, timed run returning the output path)
+CASES: Dict[str, tuple] = {
+    "events_archive.write_events": (None, bench_write_events),
+    "generate_ticket_users.generate_csv": (None, bench_users_csv),
+    "generate_events.generate_events": (None, bench_generate_events),
+    "insert_events_from_json.generate_insert_statements": (setup_insert_statements, bench_insert_statements),
+}
+
+def run_case(name: str, rows: int) -> Dict:
+    """Run one case in this process and return its measurements"""
+    setup, run = CASES[name]
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if setup:
+                setup(rows, work_dir)
+            start = time.perf_counter()
+            output = run(rows, work_dir)
+            elapsed = time.perf_counter() - start
+        output_bytes = os.path.getsize(output)
+    
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+    return {
+        "case": name,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_bytes": peak_bytes,
+        "output_bytes": output_bytes,
+    }
+
+def run_isolated(name: str, rows: int) -> Dict:
+    """Run one case in a subprocess so peak RSS is not shared between cases"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", name, "--rows", str(rows)],
+        cwd=REPO_DIR, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """Describe every case that regressed by more than threshold against baseline"""
+    previous = {(result["case"], result["rows"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["case"], result["rows"]))
+        if old is None:
+            continue
+        label = f"{result['case']} @ {result['rows']:,}"
+        if old["rows_per_sec"] and result["rows_per_sec"] < old["rows_per_sec"] * (1 - threshold):
+            regressions.append(f"{label}: rows/sec {old['rows_per_sec']:,.0f} -> {result['rows_per_sec']:,.0f}")
+        if result["peak_rss_bytes"] > old["peak_rss_bytes"] * (1 + threshold):
+            regressions.append(f"{label}: peak RSS {old['peak_rss_bytes'] / 2**20:,.1f} MB -> {result['peak_rss_bytes'] / 2**20:,.1f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generator and loader scripts")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), help="cases to run")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES, help="row counts to run each case at")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown or memory growth reported as a regression (default 0.10)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.rows)))
+        return
+    
+    results = []
+    for name in args.cases:
+        for rows in args.scales:
+            result = run_isolated(name, rows)
+            results.append(result)
+            print(f"{name:<52} {rows:>10,} rows  {result['rows_per_sec']:>12,.0f} rows/sec  "
+                  f"{result['peak_rss_bytes'] / 2**20:>8,.1f} MB peak  {result['output_bytes']:>14,} bytes")
+    
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Checkpoint files for resumable generation runs.
+
+A checkpoint is a small JSON file next to the output recording how far a run
+got: the next ID to generate, the generator state needed to continue, and the
+size of every output file at that point. Outputs are only ever appended to,
+so resuming truncates each file back to its recorded size and continues
+writing from there, which gives the same bytes as an uninterrupted run.
+
+Checkpoints are replaced atomically, so a crash while saving leaves the
+previous one intact.
+"""
+import json
+import os
+from typing import Dict, IO, Optional
+
+import compression
+
+def path_for(output: str) -> str:
+    """Default checkpoint file for an output path"""
+    return output.rstrip("/" + os.sep) + ".checkpoint"
+
+def load(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save(path: str, state: Dict) -> None:
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def synced_size(f: IO) -> int:
+    """Flush f to disk and return its size in bytes"""
+    f.flush()
+    os.fsync(f.fileno())
+    return os.fstat(f.fileno()).st_size
+
+def reopen(path: str, size: int, mode: str = "ab", **kwargs) -> IO:
+    """Truncate path to size, dropping anything written after the checkpoint, and open it for appending
+
+    Compressed outputs are cut at a block boundary, so appending new blocks
+    keeps them valid.
+    """
+    actual = os.path.getsize(path)
+    if actual < size:
+        raise ValueError(f"{path} has {actual:,} bytes but the checkpoint expects at least {size:,}")
+    os.truncate(path, size)
+    return compression.open_output(path, mode, **kwargs)
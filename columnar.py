@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Columnar, memory-mappable storage for generated datasets.
+
+A dataset is a directory holding meta.json plus one file per column:
+
+- fixed-width columns (ids, timestamps, flags) are raw little-endian NumPy arrays in <name>.bin
+- categorical columns store one small integer code per row in <name>.bin,
+  with the category strings listed in meta.json
+- variable-length strings store UTF-8 bytes back to back in <name>.bytes and
+  rows + 1 int64 offsets into them in <name>.offsets
+
+ColumnarDataset maps these files with np.memmap, so opening a multi-million row
+dataset only reads meta.json, and rows or whole columns are read on demand.
+"""
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import checkpoints
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+FIXED = "fixed"
+CATEGORY = "category"
+STRING = "string"
+
+# (name, kind, dtype); dtype is only used by fixed and category columns
+Schema = Sequence[Tuple[str, str, Optional[str]]]
+
+EVENTS_SCHEMA: Schema = [
+    ("id", FIXED, "<i4"),
+    ("title", STRING, None),
+    ("description", CATEGORY, "|u1"),
+    ("type", CATEGORY, "|u1"),
+    ("datetime_start", FIXED, "<M8[s]"),
+    ("provider", CATEGORY, "|u1"),
+]
+
+USERS_SCHEMA: Schema = [
+    ("user_id", FIXED, "<i4"),
+    ("email", STRING, None),
+    ("password_hash", STRING, None),
+    ("password_plain", STRING, None),
+    ("first_name", STRING, None),
+    ("surname", STRING, None),
+    ("birthday", FIXED, "<M8[D]"),
+    ("registered_at", FIXED, "<M8[s]"),
+    ("is_active", FIXED, "|b1"),
+    ("last_logged_in", FIXED, "<M8[s]"),
+]
+
+class CategoryCodes:
+    """A categorical column given as integer codes into its own list of categories
+
+    ColumnarWriter.append takes these in place of strings, so dictionary-encoded
+    data (see event_batch.py) is written by remapping the dictionary only.
+    """
+
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes: np.ndarray, categories: Sequence[str]):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+class ColumnarWriter:
+    """Append column batches to a columnar dataset directory"""
+
+    def __init__(self, path: str, schema: Schema, state: Optional[Dict] = None):
+        self.path = path
+        self.schema = list(schema)
+        self.rows = 0
+        self.categories: Dict[str, Dict[str, int]] = {}
+        self.string_sizes: Dict[str, int] = {}
+        self.files = {}
+        
+        if state is not None:
+            self._resume(state)
+            return
+        
+        os.makedirs(path, exist_ok=True)
+        for name, kind, dtype in self.schema:
+            if kind == STRING:
+                self.files[name] = (open(self._file(name, "bytes"), "wb"), open(self._file(name, "offsets"), "wb"))
+                np.zeros(1, dtype="<i8").tofile(self.files[name][1])
+                self.string_sizes[name] = 0
+            else:
+                self.files[name] = open(self._file(name, "bin"), "wb")
+                if kind == CATEGORY:
+                    self.categories[name] = {}
+
+    def _resume(self, state: Dict) -> None:
+        # Continue a dataset from checkpoint(): files are cut back to their
+        # recorded sizes, so rows appended after the checkpoint are dropped
+        self.rows = state["rows"]
+        self.string_sizes = dict(state["string_sizes"])
+        self.categories = {name: {value: code for code, value in enumerate(values)}
+                           for name, values in state["categories"].items()}
+        sizes = state["sizes"]
+        for name, kind, dtype in self.schema:
+            if kind == STRING:
+                self.files[name] = tuple(checkpoints.reopen(self._file(name, suffix), sizes[f"{name}.{suffix}"])
+                                         for suffix in ("bytes", "offsets"))
+            else:
+                self.files[name] = checkpoints.reopen(self._file(name, "bin"), sizes[f"{name}.bin"])
+
+    def checkpoint(self) -> Dict:
+        """Flush every column file and return the state needed to resume from here"""
+        sizes = {}
+        for name, kind, dtype in self.schema:
+            if kind == STRING:
+                for suffix, f in zip(("bytes", "offsets"), self.files[name]):
+                    sizes[f"{name}.{suffix}"] = checkpoints.synced_size(f)
+            else:
+                sizes[f"{name}.bin"] = checkpoints.synced_size(self.files[name])
+        return {
+            "rows": self.rows,
+            "string_sizes": dict(self.string_sizes),
+            "categories": {name: list(codes) for name, codes in self.categories.items()},
+            "sizes": sizes,
+        }
+
+    def _file(self, name: str, suffix: str) -> str:
+        return os.path.join(self.path, f"{name}.{suffix}")
+
+    def append(self, columns: Dict[str, Sequence]) -> None:
+        """Append one batch; every column must have the same length
+
+        Categorical columns may be strings or CategoryCodes.
+        """
+        count = None
+        for name, kind, dtype in self.schema:
+            values = columns[name]
+            if count is None:
+                count = len(values)
+            elif len(values) != count:
+                raise ValueError(f"Column {name!r} has {len(values)} rows, expected {count}")
+            
+            if kind == FIXED:
+                np.asarray(values, dtype=dtype).tofile(self.files[name])
+            elif kind == CATEGORY and isinstance(values, CategoryCodes):
+                self._remap_categories(name, values, dtype).tofile(self.files[name])
+            elif kind == CATEGORY:
+                self._encode_categories(name, values, dtype).tofile(self.files[name])
+            else:
+                self._append_strings(name, values)
+        
+        self.rows += count or 0
+
+    def _category_code(self, name: str, value: str, dtype: str) -> int:
+        codes = self.categories[name]
+        code = codes.get(value)
+        if code is None:
+            limit = np.iinfo(np.dtype(dtype)).max + 1
+            if len(codes) >= limit:
+                raise ValueError(f"Column {name!r} has more than {limit} categories")
+            code = codes[value] = len(codes)
+        return code
+
+    def _encode_categories(self, name: str, values: Sequence[str], dtype: str) -> np.ndarray:
+        codes = self.categories[name]
+        encoded = []
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = self._category_code(name, value, dtype)
+            encoded.append(code)
+        return np.array(encoded, dtype=dtype)
+
+    def _remap_categories(self, name: str, column: CategoryCodes, dtype: str) -> np.ndarray:
+        # New categories are numbered in order of first appearance, as for strings
+        used, first = np.unique(column.codes, return_index=True)
+        lookup = np.zeros(len(column.categories), dtype=dtype)
+        for code in used[np.argsort(first)].tolist():
+            lookup[code] = self._category_code(name, column.categories[code], dtype)
+        return lookup[column.codes]
+
+    def _append_strings(self, name: str, values: Sequence[str]) -> None:
+        data_file, offsets_file = self.files[name]
+        encoded = [value.encode("utf-8") for value in values]
+        lengths = np.fromiter((len(value) for value in encoded), dtype="<i8", count=len(encoded))
+        offsets = self.string_sizes[name] + np.cumsum(lengths)
+        data_file.write(b"".join(encoded))
+        offsets.tofile(offsets_file)
+        if len(offsets):
+            self.string_sizes[name] = int(offsets[-1])
+
+    def close(self) -> None:
+        for handle in self.files.values():
+            for f in handle if isinstance(handle, tuple) else (handle,):
+                f.close()
+        
+        columns = {}
+        for name, kind, dtype in self.schema:
+            column = {"kind": kind}
+            if dtype:
+                column["dtype"] = dtype
+            if kind == CATEGORY:
+                column["categories"] = list(self.categories[name])
+            columns[name] = column
+        
+        meta = {"version": FORMAT_VERSION, "rows": self.rows, "columns": columns}
+        with open(os.path.join(self.path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class ColumnarDataset:
+    """Zero-copy reader for a columnar dataset directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.rows: int = self.meta["rows"]
+        self.columns: Dict[str, Dict] = self.meta["columns"]
+        self._maps: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _map(self, name: str, suffix: str, dtype: str, length: int) -> np.ndarray:
+        key = f"{name}.{suffix}"
+        if key not in self._maps:
+            if length == 0:
+                self._maps[key] = np.zeros(0, dtype=dtype)
+            else:
+                self._maps[key] = np.memmap(os.path.join(self.path, key), dtype=dtype, mode="r", shape=(length,))
+        return self._maps[key]
+
+    def _string_data(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        offsets = self._map(name, "offsets", "<i8", self.rows + 1)
+        data = self._map(name, "bytes", "u1", int(offsets[-1]))
+        return offsets, data
+
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped values of a fixed column, or codes of a categorical one"""
+        column = self.columns[name]
+        if column["kind"] == STRING:
+            raise TypeError(f"Column {name!r} holds strings, use strings() instead")
+        return self._map(name, "bin", column["dtype"], self.rows)
+
+    def categories(self, name: str) -> List[str]:
+        return self.columns[name]["categories"]
+
+    def strings(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Decode the strings of rows [start, stop)"""
+        if self.columns[name]["kind"] == CATEGORY:
+            categories = self.categories(name)
+            return [categories[code] for code in self.column(name)[start:stop].tolist()]
+        
+        offsets, data = self._string_data(name)
+        bounds = offsets[start:(self.rows if stop is None else stop) + 1].tolist()
+        if not bounds:
+            return []
+        blob = data[bounds[0]:bounds[-1]].tobytes()
+        base = bounds[0]
+        return [blob[begin - base:end - base].decode("utf-8") for begin, end in zip(bounds, bounds[1:])]
+
+    def value(self, name: str, index: int):
+        """Value of one cell as a Python object"""
+        kind = self.columns[name]["kind"]
+        if kind == STRING:
+            offsets, data = self._string_data(name)
+            return data[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+        if kind == CATEGORY:
+            return self.categories(name)[int(self.column(name)[index])]
+        return self.column(name)[index].item()
+
+    def row(self, index: int) -> Dict:
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        return {name: self.value(name, index) for name in self.columns}
+
+    def __getitem__(self, index: int) -> Dict:
+        return self.row(index)
+
+    def iter_batches(self, batch_size: int = 100_000, first: int = 0, last: Optional[int] = None) -> Iterator[Dict[str, list]]:
+        """Yield consecutive row ranges of rows [first, last) as dicts of decoded Python lists"""
+        last = self.rows if last is None else min(last, self.rows)
+        for start in range(first, last, batch_size):
+            stop = min(start + batch_size, last)
+            batch = {}
+            for name, column in self.columns.items():
+                if column["kind"] == FIXED:
+                    batch[name] = self.column(name)[start:stop].tolist()
+                else:
+                    batch[name] = self.strings(name, start, stop)
+            yield batch
+
+def is_columnar(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+def iter_event_dicts(dataset: ColumnarDataset, batch_size: int = 100_000,
+                     first: int = 0, last: Optional[int] = None) -> Iterator[Dict]:
+    """Yield events of a columnar archive (rows [first, last)) in the same shape as the JSON archive"""
+    names = list(dataset.columns)
+    for batch in dataset.iter_batches(batch_size, first, last):
+        if "datetime_start" in batch:
+            batch["datetime_start"] = [value.isoformat() for value in batch["datetime_start"]]
+        for values in zip(*(batch[name] for name in names)):
+            yield dict(zip(names, values))
+
+def event_columns(events: Iterable[Dict]) -> Dict[str, list]:
+    """Transpose event dicts into EVENTS_SCHEMA columns"""
+    events = list(events)
+    return {
+        "id": [event["id"] for event in events],
+        "title": [event["title"] for event in events],
+        "description": [event["description"] for event in events],
+        "type": [event["type"] for event in events],
+        "datetime_start": np.array([event["datetime_start"] for event in events], dtype="datetime64[s]"),
+        "provider": [event["provider"] for event in events],
+    }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Compressed outputs and inputs selected by file extension.
+
+open_output() returns a plain file for ordinary paths and a compressing
+stream for .gz and .zst paths. Written data is cut into blocks that are
+compressed on a thread pool (zlib and zstd release the GIL), so compression
+overlaps with generation and uses every core. Each block becomes a complete
+gzip member or zstd frame; the concatenation is a valid .gz/.zst file that
+gzip, zcat, zstd and psql pipelines read as one stream.
+
+Because blocks end on member boundaries, flush() leaves a file that can be
+truncated at its current size and appended to later, which is what
+checkpoints.reopen() relies on.
+
+open_input() is the matching streaming reader. zstd support needs the optional
+zstandard package (python3 -m pip install zstandard).
+"""
+import gzip
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Optional
+
+# Uncompressed bytes per compressed block
+BLOCK_SIZE = 4 * 2 ** 20
+
+GZIP_LEVEL = 3
+ZSTD_LEVEL = 3
+
+CODECS = (".gz", ".zst")
+
+def codec_for(path: str) -> Optional[str]:
+    """The compression extension of path, or None for plain files"""
+    for extension in CODECS:
+        if path.endswith(extension):
+            return extension
+    return None
+
+def strip_codec(path: str) -> str:
+    """path without its compression extension, e.g. for format detection"""
+    codec = codec_for(path)
+    return path[:-len(codec)] if codec else path
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the zstandard package: python3 -m pip install zstandard") from None
+    return zstandard
+
+def _gzip_block(data: bytes) -> bytes:
+    # mtime=0 keeps the output reproducible
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+_zstd_local = threading.local()
+
+def _zstd_block(data: bytes) -> bytes:
+    # Compressors are not thread-safe, so each pool thread keeps its own
+    compressor = getattr(_zstd_local, "compressor", None)
+    if compressor is None:
+        compressor = _zstd_local.compressor = _zstandard().ZstdCompressor(level=ZSTD_LEVEL)
+    return compressor.compress(data)
+
+class ParallelCompressor(io.BufferedIOBase):
+    """Binary stream compressing fixed-size blocks on a thread pool, written in order"""
+
+    def __init__(self, raw: IO[bytes], compress_block: Callable[[bytes], bytes],
+                 block_size: int = BLOCK_SIZE, workers: Optional[int] = None):
+        self.raw = raw
+        self.compress_block = compress_block
+        self.block_size = block_size
+        workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # Bound the blocks in flight so memory stays at a few blocks per thread
+        self.max_pending = workers * 2
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self.pending.append(self.executor.submit(self.compress_block, block))
+        while len(self.pending) > self.max_pending:
+            self.raw.write(self.pending.popleft().result())
+
+    def flush(self) -> None:
+        """Compress and write everything buffered so far, ending the current block"""
+        if self.closed:
+            return
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.raw.write(self.pending.popleft().result())
+        self.raw.flush()
+
+    def fileno(self) -> int:
+        return self.raw.fileno()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown()
+            super().close()
+            self.raw.close()
+
+def open_output(path: str, mode: str = "w", encoding: str = "utf-8", newline: Optional[str] = None,
+                workers: Optional[int] = None) -> IO:
+    """Open path for writing ("w", "wb", "a" or "ab"), compressing by extension"""
+    binary = "b" in mode
+    codec = codec_for(path)
+    if codec is None:
+        if binary:
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, newline=newline)
+
+    if codec == ".zst":
+        _zstandard()
+    raw = open(path, "ab" if mode.startswith("a") else "wb")
+    stream = ParallelCompressor(raw, _gzip_block if codec == ".gz" else _zstd_block, workers=workers)
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+def open_input(path: str, mode: str = "r", encoding: str = "utf-8", newline: Optional[str] = None) -> IO:
+    """Open path for streaming reads ("r" or "rb"), decompressing by extension"""
+    binary = "b" in mode
+    codec = codec_for(path)
+    if codec is None:
+        if binary:
+            return open(path, "rb")
+        return open(path, "r", encoding=encoding, newline=newline)
+
+    if codec == ".gz":
+        stream = gzip.open(path, "rb")
+    else:
+        stream = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True,
+                                                               closefd=True)
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Vectorized date/time sampling and bulk formatting shared by the generators.
+
+Dates are drawn as whole datetime64 arrays from a NumPy generator and
+formatted to strings in bulk, instead of building one datetime per row.
+Relative dates ("the next 90 days", "up to 5 years ago") are anchored on a
+fixed NOW rather than the wall clock, so a given seed always produces the
+same data. Pass another anchor (e.g. from a --now option) to move the window.
+"""
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+# Reference "now" for reproducible runs: the HackLoad 2025 data cut-off
+NOW = np.datetime64('2025-08-15T00:00:00', 's')
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+def now_anchor(value: Optional[DateLike] = None) -> np.datetime64:
+    """The fixed anchor, or value as a seconds-resolution datetime64"""
+    if value is None:
+        return NOW
+    return np.datetime64(value, 's')
+
+def sample_day_offsets(rng, count: int, low: int, high: int) -> np.ndarray:
+    """Uniform whole-day offsets in [low, high]"""
+    return rng.integers(low, high + 1, count)
+
+def sample_dates(rng, count: int, first_day: DateLike, num_days: int) -> np.ndarray:
+    """Uniform dates in [first_day, first_day + num_days) as datetime64[D]"""
+    return np.datetime64(first_day, 'D') + rng.integers(0, num_days, count)
+
+def sample_times(rng, count: int, hours: Sequence[int], minutes: Sequence[int],
+                 hour_weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Times of day as timedelta64[s], hours optionally weighted"""
+    p = None
+    if hour_weights is not None:
+        p = np.asarray(hour_weights, dtype=float)
+        p /= p.sum()
+    hour = rng.choice(np.asarray(hours), count, p=p)
+    minute = rng.choice(np.asarray(minutes), count)
+    return (hour * 3600 + minute * 60).astype('timedelta64[s]')
+
+def sample_datetimes(rng, count: int, first_day: DateLike, num_days: int, hours: Sequence[int],
+                     minutes: Sequence[int], hour_weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Day in [first_day, first_day + num_days) plus a sampled time of day, as datetime64[s]"""
+    days = sample_dates(rng, count, first_day, num_days)
+    return days.astype('datetime64[s]') + sample_times(rng, count, hours, minutes, hour_weights)
+
+def format_iso(values: np.ndarray) -> List[str]:
+    """'YYYY-MM-DDTHH:MM:SS' strings, as datetime.isoformat() gives for whole seconds"""
+    return np.datetime_as_string(values, unit='s').tolist()
+
+def format_timestamps(values: np.ndarray) -> List[str]:
+    """'%Y-%m-%d %H:%M:%S' strings"""
+    formatted = np.datetime_as_string(values, unit='s').astype('U19')
+    formatted.view('U1').reshape(-1, 19)[:, 10] = ' '
+    return formatted.tolist()
+
+def format_dates(values: np.ndarray) -> List[Optional[str]]:
+    """'%Y-%m-%d' strings, None for NaT"""
+    formatted = np.datetime_as_string(values, unit='D').tolist()
+    return [None if value == 'NaT' else value for value in formatted]
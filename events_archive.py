@@ -1,13 +1,51 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import os
 import random
-from datetime import datetime, timedelta
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional
+
+import numpy as np
+
+import checkpoints
+import columnar
+import compression
+import datetime_sampling
+import event_batch
+import instrumentation
+import pgcopy
+import profiles
+from event_batch import EventBatch, EventDictionaries
+from titles import TitleTable
+
+# Events per shard in parallel mode. Shard boundaries depend only on this value,
+# so the output for a given seed does not change with the number of workers.
+SHARD_SIZE = 250_000
+
+# Events serialized and written per write call
+WRITE_CHUNK_SIZE = 10_000
+
+# Event start times, mostly evening hours
+EVENT_HOURS = [17, 18, 19, 20, 21, 22]
+EVENT_HOUR_WEIGHTS = [10, 20, 30, 25, 10, 5]
+EVENT_MINUTES = [0, 15, 30, 45]
+
+# Archive IDs start here by default, above the IDs of generate_events.py (1-10,000)
+ARCHIVE_ID_START = 100000
+
+# Supported output formats; "normalized" is a psql script with lookup tables (see event_batch.py)
+FORMATS = ("json", "jsonl", "columnar", "normalized")
 
 class EventsArchiveGenerator:
-    def __init__(self):
-        # Archive events will use IDs starting from 100,000 to avoid conflicts with generate_events.py (IDs 1-10,000)
-        self.archive_id_start = 100000
+    def __init__(self, seed: Optional[int] = None, archive_id_start: int = ARCHIVE_ID_START):
+        self.rng = np.random.default_rng(seed)
+        
+        # Archive events use IDs from archive_id_start up to avoid conflicts with generate_events.py
+        self.archive_id_start = archive_id_start
         
         self.event_types = ["film", "game", "cinema", "concert", "theater", "sport", "exhibition"]
         self.providers = ["TicketRu", "EventWorld", "ShowTime", "CultureCity", "SportHub"]
@@ -39,80 +77,89 @@ class EventsArchiveGenerator:
             "Грандиозное событие, которое станет настоящим праздником для души. Яркие эмоции и восторженные отзывы публики."
         ]
 
-    def generate_event_title(self, event_type: str) -> str:
-        if event_type == "film":
-            title_base = random.choice(self.film_titles)
-            person = random.choice(self.names)
-            templates = [
-                f'Премьера фильма "{title_base}" с участием {person}',
-                f'Показ картины "{title_base}" с {person} в главной роли',
-                f'Киносеанс "{title_base}" режиссера {person}',
-                f'Кинопоказ "{title_base}" в честь {person}'
-            ]
-        elif event_type == "game":
-            show = random.choice(self.game_shows)
-            host = random.choice(self.names)
-            templates = [
-                f'Игровое шоу "{show}" с ведущим {host}',
-                f'Телешоу "{show}" при участии {host}',
-                f'Интеллектуальная игра "{show}" с {host}'
-            ]
-        elif event_type == "cinema":
-            title_base = random.choice(self.film_titles)
-            person = random.choice(self.names)
-            templates = [
-                f'Кинопоказ "{title_base}" в честь {person}',
-                f'Киномарафон "{title_base}" с {person}',
-                f'Ретроспектива "{title_base}" посвященная {person}'
-            ]
-        elif event_type == "concert":
-            person = random.choice(self.names)
-            templates = [
-                f'Концерт {person}',
-                f'Сольный концерт {person}',
-                f'Музыкальный вечер с {person}',
-                f'Гала-концерт {person}'
-            ]
-        elif event_type == "theater":
-            title_base = random.choice(self.film_titles)
-            person = random.choice(self.names)
-            templates = [
-                f'Спектакль "{title_base}" с {person}',
-                f'Театральная постановка "{title_base}" при участии {person}',
-                f'Премьера спектакля "{title_base}" с {person} в главной роли'
-            ]
-        elif event_type == "sport":
-            person = random.choice(self.names)
-            templates = [
-                f'Спортивное соревнование с участием {person}',
-                f'Турнир памяти {person}',
-                f'Чемпионат города при поддержке {person}'
-            ]
-        else:  # exhibition
-            person = random.choice(self.names)
-            templates = [
-                f'Выставка работ {person}',
-                f'Персональная выставка {person}',
-                f'Экспозиция "{random.choice(self.film_titles)}" куратор {person}'
+        
+        # Title templates per event type; {title}, {show} and {person} range over
+        # film_titles, game_shows and names
+        self.title_templates = {
+            "film": [
+                'Премьера фильма "{title}" с участием {person}',
+                'Показ картины "{title}" с {person} в главной роли',
+                'Киносеанс "{title}" режиссера {person}',
+                'Кинопоказ "{title}" в честь {person}'
+            ],
+            "game": [
+                'Игровое шоу "{show}" с ведущим {person}',
+                'Телешоу "{show}" при участии {person}',
+                'Интеллектуальная игра "{show}" с {person}'
+            ],
+            "cinema": [
+                'Кинопоказ "{title}" в честь {person}',
+                'Киномарафон "{title}" с {person}',
+                'Ретроспектива "{title}" посвященная {person}'
+            ],
+            "concert": [
+                'Концерт {person}',
+                'Сольный концерт {person}',
+                'Музыкальный вечер с {person}',
+                'Гала-концерт {person}'
+            ],
+            "theater": [
+                'Спектакль "{title}" с {person}',
+                'Театральная постановка "{title}" при участии {person}',
+                'Премьера спектакля "{title}" с {person} в главной роли'
+            ],
+            "sport": [
+                'Спортивное соревнование с участием {person}',
+                'Турнир памяти {person}',
+                'Чемпионат города при поддержке {person}'
+            ],
+            "exhibition": [
+                'Выставка работ {person}',
+                'Персональная выставка {person}',
+                'Экспозиция "{title}" куратор {person}'
             ]
+        }
         
-        return random.choice(templates)
+        # Every possible title, expanded once; events store indices into it
+        self.title_table = TitleTable()
+        for event_type in self.event_types:
+            for template in self.title_templates[event_type]:
+                self.title_table.add_template(event_type, template, title=self.film_titles,
+                                              show=self.game_shows, person=self.names)
+        
+        # Batches store codes into these lists instead of the strings
+        self.dictionaries = EventDictionaries(self.title_table.titles, self.descriptions, self.event_types,
+                                              self.providers)
+
+    def generate_event_title(self, event_type: str) -> str:
+        type_index = np.array([self.event_types.index(event_type)])
+        return self.title_table.lookup(self.title_table.sample(self.rng, self.event_types, type_index))[0]
+
+    def sample_datetimes(self, count: int, start_date: datetime, end_date: datetime) -> np.ndarray:
+        days_between = (end_date - start_date).days
+        return datetime_sampling.sample_datetimes(
+            self.rng, count, start_date.date(), days_between, EVENT_HOURS, EVENT_MINUTES, EVENT_HOUR_WEIGHTS)
+
+    def generate_datetimes(self, count: int, start_date: datetime, end_date: datetime) -> List[str]:
+        return datetime_sampling.format_iso(self.sample_datetimes(count, start_date, end_date))
 
     def generate_datetime(self, start_date: datetime, end_date: datetime) -> str:
-        time_between = end_date - start_date
-        days_between = time_between.days
-        random_days = random.randrange(days_between)
-        random_date = start_date + timedelta(days=random_days)
-        
-        # Generate random time (mostly evening hours for events)
-        hour = random.choices(
-            [17, 18, 19, 20, 21, 22],
-            weights=[10, 20, 30, 25, 10, 5]
-        )[0]
-        minute = random.choice([0, 15, 30, 45])
+        return self.generate_datetimes(1, start_date, end_date)[0]
+
+    def generate_batch(self, start_id: int, count: int, start_date: datetime, end_date: datetime) -> EventBatch:
+        # Every field is drawn for the whole range at once, as codes into
+        # self.dictionaries rather than strings
+        type_index = self.rng.integers(0, len(self.event_types), count)
+        titles = self.title_table.sample(self.rng, self.event_types, type_index)
+        descriptions = self.rng.integers(0, len(self.descriptions), count).astype(np.uint8)
+        datetimes = self.sample_datetimes(count, start_date, end_date)
+        providers = self.rng.integers(0, len(self.providers), count).astype(np.uint8)
         
-        random_datetime = random_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        return random_datetime.isoformat()
+        return EventBatch(self.dictionaries, np.arange(start_id, start_id + count, dtype=np.int64), titles,
+                          descriptions, type_index.astype(np.uint8), datetimes, providers)
+
+    def generate_range(self, start_id: int, count: int, start_date: datetime, end_date: datetime) -> List[Dict]:
+        return self.generate_batch(start_id, count, start_date, end_date).to_dicts()
 
     def generate_events(self, count: int, start_year: int = 2015, end_year: int = 2024) -> List[Dict]:
         events = []
@@ -123,41 +170,341 @@ class EventsArchiveGenerator:
         print(f"Archive events will have IDs starting from {self.archive_id_start:,}")
         print(f"ID range: {self.archive_id_start:,} to {self.archive_id_start + count - 1:,}")
         
-        for i in range(count):
-            if (i + 1) % 100000 == 0:
-                print(f"Generated {i + 1:,} events...")
-            
-            event_type = random.choice(self.event_types)
-            
-            event = {
-                "id": self.archive_id_start + i,
-                "title": self.generate_event_title(event_type),
-                "description": random.choice(self.descriptions),
-                "type": event_type,
-                "datetime_start": self.generate_datetime(start_date, end_date),
-                "provider": random.choice(self.providers)
-            }
-            
-            events.append(event)
+        for offset in range(0, count, 100000):
+            chunk = min(100000, count - offset)
+            with instrumentation.stage("generate"):
+                events.extend(self.generate_range(self.archive_id_start + offset, chunk, start_date, end_date))
+            instrumentation.advance(chunk)
         
         return events
 
-    def save_events(self, events: List[Dict], filename: str):
-        print(f"Saving {len(events):,} events to {filename}...")
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(events, f, ensure_ascii=False, indent=2)
-        print(f"Successfully saved to {filename}")
+    def iter_shards(self, count: int, start_year: int, end_year: int, seed: int, workers: int,
+                    shard_size: int = SHARD_SIZE, first_shard: int = 0, first_offset: int = 0) -> Iterator[EventBatch]:
+        # Shard i covers IDs [start + i * shard_size, ...) and is seeded with seed + i,
+        # so shards are independent and can be generated in any process. A resumed
+        # or appended run starts at shard first_shard and event offset first_offset.
+        tasks = []
+        for shard_index, offset in enumerate(range(first_offset, count, shard_size), first_shard):
+            tasks.append((seed + shard_index, self.archive_id_start + offset,
+                          min(shard_size, count - offset), start_year, end_year))
+        
+        if workers <= 1:
+            for task in tasks:
+                yield _generate_shard(*task)
+            return
+        
+        # Keep a bounded window of shards in flight and yield them in ID order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(_generate_shard, *task))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_events_parallel(self, count: int, start_year: int = 2015, end_year: int = 2024,
+                             seed: int = 0, workers: Optional[int] = None) -> Iterator[Dict]:
+        workers = workers or os.cpu_count() or 1
+        
+        print(f"Generating {count:,} archive events from {start_year} to {end_year} "
+              f"with {workers} workers (seed {seed})...")
+        print(f"ID range: {self.archive_id_start:,} to {self.archive_id_start + count - 1:,}")
+        
+        shards = self.iter_shards(count, start_year, end_year, seed, workers)
+        while True:
+            with instrumentation.stage("generate"):
+                shard = next(shards, None)
+            if shard is None:
+                return
+            instrumentation.advance(len(shard))
+            yield from shard.to_dicts()
+
+    def generate_events_parallel(self, count: int, start_year: int = 2015, end_year: int = 2024,
+                                 seed: int = 0, workers: Optional[int] = None) -> List[Dict]:
+        return list(self.iter_events_parallel(count, start_year, end_year, seed, workers))
+
+    def save_events(self, events: Iterable[Dict], filename: str, fmt: str = "json", indent: Optional[int] = None) -> int:
+        print(f"Saving events to {filename} ({fmt})...")
+        count = write_events(events, filename, fmt, indent)
+        print(f"Successfully saved {count:,} events to {filename}")
+        return count
+
+def iter_chunks(events, size: int) -> Iterator:
+    """Split an EventBatch into slices, or an iterable of event dicts into lists, of at most size events"""
+    if isinstance(events, EventBatch):
+        for start in range(0, len(events), size):
+            yield events[start:start + size]
+        return
+    iterator = iter(events)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class JsonEventsOutput:
+    """Streams events to a JSON array ("json") or one object per line ("jsonl")
+
+    Events are serialized one chunk at a time as they arrive, so memory use
+    does not depend on the number of events. state from checkpoint() reopens a
+    partly written file and continues after the last checkpointed event.
+    """
+
+    def __init__(self, filename: str, fmt: str = "json", indent: Optional[int] = None, state: Optional[Dict] = None):
+        self.fmt = fmt
+        self.indent = indent
+        if state is None:
+            self.file = compression.open_output(filename, "wb")
+            self.count = 0
+            if fmt == "json":
+                self.file.write(b"[")
+        else:
+            self.file = checkpoints.reopen(filename, state["size"])
+            self.count = state["events"]
+
+    def format(self, chunk) -> List[str]:
+        # Batches encode their dictionary strings once; indented output goes through json.dumps
+        if isinstance(chunk, EventBatch):
+            if self.indent is None:
+                return chunk.json_lines()
+            chunk = chunk.to_dicts()
+        return [json.dumps(event, ensure_ascii=False, indent=self.indent) for event in chunk]
+
+    def write(self, events) -> None:
+        for chunk in iter_chunks(events, WRITE_CHUNK_SIZE):
+            with instrumentation.stage("format"):
+                lines = self.format(chunk)
+                if self.fmt == "jsonl":
+                    text = "\n".join(lines) + "\n"
+                else:
+                    text = (",\n" if self.count else "\n") + ",\n".join(lines)
+            with instrumentation.stage("io"):
+                self.file.write(text.encode("utf-8"))
+            self.count += len(chunk)
+
+    def checkpoint(self) -> Dict:
+        return {"size": checkpoints.synced_size(self.file), "events": self.count}
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self.file.write(b"\n]\n")
+        self.file.close()
+
+class NormalizedEventsOutput:
+    """Streams events to a psql script of lookup tables and foreign keys (see event_batch.py)
+
+    The lookup tables hold every dictionary value and are written up front,
+    so events only add one short COPY row each.
+    """
+
+    def __init__(self, filename: str, dictionaries: EventDictionaries, state: Optional[Dict] = None):
+        self.dictionaries = dictionaries
+        if state is None:
+            self.file = compression.open_output(filename, "wb")
+            self.count = 0
+            self.file.write(event_batch.normalized_header(dictionaries).encode("utf-8"))
+        else:
+            self.file = checkpoints.reopen(filename, state["size"])
+            self.count = state["events"]
+
+    def write(self, events) -> None:
+        for chunk in iter_chunks(events, WRITE_CHUNK_SIZE):
+            with instrumentation.stage("format"):
+                if not isinstance(chunk, EventBatch):
+                    chunk = self.dictionaries.encode(chunk)
+                text = chunk.normalized_rows()
+            with instrumentation.stage("io"):
+                self.file.write(text.encode("utf-8"))
+            self.count += len(chunk)
+
+    def checkpoint(self) -> Dict:
+        return {"size": checkpoints.synced_size(self.file), "events": self.count}
+
+    def close(self) -> None:
+        self.file.write(pgcopy.END_OF_DATA.encode("utf-8"))
+        self.file.close()
+
+class ColumnarEventsOutput:
+    """Writes events to a memory-mappable column directory (see columnar.py)"""
+
+    def __init__(self, path: str, state: Optional[Dict] = None, batch_size: int = 100_000):
+        self.writer = columnar.ColumnarWriter(path, columnar.EVENTS_SCHEMA, state)
+        self.batch_size = batch_size
+
+    @property
+    def count(self) -> int:
+        return self.writer.rows
+
+    def write(self, events) -> None:
+        for chunk in iter_chunks(events, self.batch_size):
+            self.writer.append(chunk.columns() if isinstance(chunk, EventBatch) else columnar.event_columns(chunk))
+
+    def checkpoint(self) -> Dict:
+        return self.writer.checkpoint()
+
+    def close(self) -> None:
+        self.writer.close()
+
+def open_events_output(filename: str, fmt: str = "json", indent: Optional[int] = None, state: Optional[Dict] = None,
+                       dictionaries: Optional[EventDictionaries] = None):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if fmt == "columnar":
+        return ColumnarEventsOutput(filename, state)
+    if fmt == "normalized":
+        return NormalizedEventsOutput(filename, dictionaries or EventsArchiveGenerator().dictionaries, state)
+    return JsonEventsOutput(filename, fmt, indent, state)
+
+def write_events(events: Iterable[Dict], filename: str, fmt: str = "json", indent: Optional[int] = None) -> int:
+    # "json" writes a single JSON array with one event per line, "jsonl" writes
+    # one JSON object per line, "columnar" writes a memory-mappable column
+    # directory (see columnar.py) and "normalized" a psql script of lookup
+    # tables and foreign keys (see event_batch.py)
+    output = open_events_output(filename, fmt, indent)
+    try:
+        output.write(events)
+    finally:
+        output.close()
+    return output.count
+
+def write_archive(generator: EventsArchiveGenerator, filename: str, fmt: str, count: int, start_year: int,
+                  end_year: int, seed: int, workers: int, indent: Optional[int] = None,
+                  checkpoint_path: Optional[str] = None, resume: bool = False, append: int = 0) -> int:
+    # Generate the archive shard by shard, saving a checkpoint after each one.
+    # Shard i is fully determined by seed + i, so the checkpoint only needs the
+    # next shard, the next ID and the output sizes. With resume the run picks
+    # up from the checkpoint, with append a finished archive is extended by
+    # that many new IDs. Checkpoints are only written when checkpoint_path is
+    # given ("" for <output>.checkpoint) or a run is resumed or appended to.
+    # Returns the number of events in the archive.
+    checkpointing = checkpoint_path is not None or resume or bool(append)
+    checkpoint_path = checkpoint_path or checkpoints.path_for(filename)
+    if resume or append:
+        state = checkpoints.load(checkpoint_path)
+        if state is None:
+            raise ValueError(f"No checkpoint found at {checkpoint_path}")
+        if append:
+            if not state["complete"]:
+                raise ValueError("The previous run did not finish; complete it with --resume before appending")
+            state["count"] += append
+            state["complete"] = False
+        # Checkpoints from before ID offsets were configurable used the default
+        generator.archive_id_start = state.setdefault("id_start", ARCHIVE_ID_START)
+        print(f"Resuming {state['output']} at event {state['events']:,} of {state['count']:,} "
+              f"(shard {state['next_shard']}, seed {state['seed']})")
+    else:
+        state = {
+            "output": filename, "format": fmt, "indent": indent, "seed": seed, "count": count,
+            "id_start": generator.archive_id_start,
+            "start_year": start_year, "end_year": end_year, "shard_size": SHARD_SIZE,
+            "next_shard": 0, "next_seed": seed, "events": 0, "last_id": None,
+            "output_state": None, "complete": False,
+        }
+        print(f"Generating {count:,} archive events from {start_year} to {end_year} "
+              f"with {workers} workers (seed {seed})...")
+    
+    first_id = generator.archive_id_start + state["events"]
+    print(f"ID range: {first_id:,} to {generator.archive_id_start + state['count'] - 1:,}")
+    
+    output = open_events_output(state["output"], state["format"], state["indent"], state["output_state"],
+                                generator.dictionaries)
+    try:
+        if checkpointing:
+            checkpoints.save(checkpoint_path, state)
+        shards = generator.iter_shards(state["count"], state["start_year"], state["end_year"], state["seed"],
+                                       workers, state["shard_size"], state["next_shard"], state["events"])
+        while True:
+            with instrumentation.stage("generate"):
+                shard = next(shards, None)
+            if shard is None:
+                break
+            output.write(shard)
+            state["next_shard"] += 1
+            state["next_seed"] = state["seed"] + state["next_shard"]
+            state["events"] += len(shard)
+            state["last_id"] = int(shard.ids[-1])
+            if checkpointing:
+                with instrumentation.stage("checkpoint"):
+                    state["output_state"] = output.checkpoint()
+                    checkpoints.save(checkpoint_path, state)
+            instrumentation.advance(len(shard))
+        
+        state["complete"] = True
+        if checkpointing:
+            checkpoints.save(checkpoint_path, state)
+    finally:
+        output.close()
+    
+    print(f"Successfully saved {state['events']:,} events to {state['output']}")
+    return state["events"]
+
+def write_events_columnar(events: Iterable[Dict], path: str, batch_size: int = 100_000) -> int:
+    output = ColumnarEventsOutput(path, batch_size=batch_size)
+    try:
+        output.write(events)
+    finally:
+        output.close()
+    return output.count
+
+def format_from_filename(filename: str) -> str:
+    filename = compression.strip_codec(filename)
+    if filename.endswith(".cols"):
+        return "columnar"
+    if filename.endswith(".sql"):
+        return "normalized"
+    return "jsonl" if filename.endswith(".jsonl") else "json"
+
+def _generate_shard(seed: int, start_id: int, count: int, start_year: int, end_year: int) -> EventBatch:
+    generator = EventsArchiveGenerator(seed)
+    return generator.generate_batch(start_id, count, datetime(start_year, 1, 1), datetime(end_year, 12, 31))
 
 def main():
-    generator = EventsArchiveGenerator()
+    parser = argparse.ArgumentParser(description="Generate the events archive")
+    parser.add_argument("--count", type=int, default=None, help="number of events to generate (default 6,000,000)")
+    parser.add_argument("--seed", type=int, default=None, help="master seed (random if omitted)")
+    parser.add_argument("--id-start", type=int, default=None, help=f"first event ID (default {ARCHIVE_ID_START:,})")
+    parser.add_argument("--start-year", type=int, default=None, help="first year of event dates (default 2015)")
+    parser.add_argument("--end-year", type=int, default=None, help="last year of event dates (default 2024)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--output", default="events_archive.json",
+                        help="output file; a .gz or .zst suffix compresses it, e.g. events_archive.jsonl.gz")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="output format (default: from the output file extension)")
+    parser.add_argument("--indent", type=int, default=None, help="indent JSON events (off by default)")
+    parser.add_argument("--checkpoint", nargs="?", const="", default=None, metavar="FILE",
+                        help="save a checkpoint after every shard, for --resume and --append "
+                             "(default file: <output>.checkpoint)")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint (settings come from the checkpoint)")
+    resume.add_argument("--append", type=int, default=0, metavar="N",
+                        help="extend a finished archive with N new events, keeping the existing ones")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser)
+    args = parser.parse_args()
+    profiles.apply(args, "archive", {"count": 6_000_000, "seed": None, "id_start": ARCHIVE_ID_START,
+                                     "start_year": 2015, "end_year": 2024})
+    
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2**32)
+    fmt = args.format or format_from_filename(args.output)
+    generator = EventsArchiveGenerator(archive_id_start=args.id_start)
     
-    # Generate 6 million archive events for the past 10 years (2015-2024)
-    # IDs will be 100,000 to 6,099,999 (avoiding conflict with generate_events.py IDs 1-10,000)
-    # Past events: all dates will be before today (August 15, 2025)
-    events = generator.generate_events(6_000_000, 2015, 2024)
+    if args.dry_run:
+        name = os.path.basename(args.output)
+        profiles.dry_run("events_archive", args.count, lambda rows, directory: write_archive(
+            EventsArchiveGenerator(archive_id_start=args.id_start), os.path.join(directory, name), fmt, rows,
+            args.start_year, args.end_year, seed, 1, args.indent), resident_rows=SHARD_SIZE, workers=args.workers,
+            sample_rows=args.dry_run)
+        return
     
-    # Save to events_archive.json
-    generator.save_events(events, "events_archive.json")
+    total = args.append or (None if args.resume else args.count)
+    # By default: 6 million archive events for the past 10 years (2015-2024) with
+    # IDs 100,000 to 6,099,999 (avoiding conflict with generate_events.py IDs 1-10,000);
+    # all dates are before the fixed August 15, 2025 anchor
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "events_archive", total):
+        write_archive(generator, args.output, fmt, args.count, args.start_year, args.end_year, seed, args.workers,
+                      args.indent, args.checkpoint, args.resume, args.append)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,15 @@
+import argparse
 import json
-import random
-from datetime import datetime, timedelta
+
+import numpy as np
+
+import datetime_sampling
+import instrumentation
+import profiles
+from titles import TitleTable
 
 # Set random seed for reproducibility
-random.seed(42)
+np_rng = np.random.default_rng(42)
 
 # Number of events to generate
 NUM_EVENTS = 10000
@@ -11,6 +17,11 @@ NUM_EVENTS = 10000
 # Event types
 EVENT_TYPES = ['film', 'cinema', 'stage', 'game']
 
+# Event start times (usually evening events) within the next 90 days
+EVENT_HOURS = [18, 19, 20, 21]
+EVENT_MINUTES = [0, 15, 30, 45]
+EVENT_WINDOW_DAYS = 90
+
 # Ticket providers
 PROVIDERS = ['TicketRu', 'EventWorld', 'ShowTime']
 
@@ -74,104 +85,126 @@ DESCRIPTION_TEMPLATES = [
     'Интерактивное шоу с участием зрителей. Возможность стать частью представления и получить ценные призы.'
 ]
 
-def generate_random_name():
-    """Generate a random Russian name"""
-    if random.choice([True, False]):
-        return random.choice(MALE_NAMES) + ' ' + random.choice(SURNAMES)
-    else:
-        return random.choice(FEMALE_NAMES) + ' ' + random.choice(SURNAMES)
+# Every "Name Surname" combination; male and female names are equally likely overall
+ALL_NAMES = ([f"{name} {surname}" for name in MALE_NAMES for surname in SURNAMES] +
+             [f"{name} {surname}" for name in FEMALE_NAMES for surname in SURNAMES])
 
-def generate_title(event_type):
-    """Generate event title based on type"""
-    name = generate_random_name()
-    template = random.choice(TITLE_TEMPLATES[event_type])
-    
+def expand_template(event_type, template):
+    """All titles one template can produce, each equally likely"""
     if event_type == 'film' or event_type == 'cinema':
-        movie_title = random.choice(MOVIE_TITLES)
+        if template.count('{}') == 2:
+            return [template.format(movie_title, name) for movie_title in MOVIE_TITLES for name in ALL_NAMES]
         if '{}' in template:
-            if template.count('{}') == 2:
-                return template.format(movie_title, name)
-            else:
-                return template.format(movie_title)
-        return template
+            return [template.format(movie_title) for movie_title in MOVIE_TITLES]
+        return [template]
     elif event_type == 'stage':
         if 'в честь' in template and '-летия' in template:
-            years = random.randint(10, 50)
-            return template.format(name, years)
+            return [template.format(name, years) for name in ALL_NAMES for years in range(10, 51)]
         elif '"{}"' in template:
-            play_title = random.choice(PLAY_TITLES)
-            return template.format(play_title, name)
+            return [template.format(play_title, name) for play_title in PLAY_TITLES for name in ALL_NAMES]
         else:
-            return template.format(name)
+            return [template.format(name) for name in ALL_NAMES]
     elif event_type == 'game':
-        game_title = random.choice(GAME_TITLES)
-        return template.format(game_title, name)
+        return [template.format(game_title, name) for game_title in GAME_TITLES for name in ALL_NAMES]
     
-    return template.format(name)
+    return [template.format(name) for name in ALL_NAMES]
+
+def build_title_table():
+    """Expand every template of every event type once"""
+    table = TitleTable()
+    for event_type in EVENT_TYPES:
+        for template in TITLE_TEMPLATES[event_type]:
+            table.add_group(event_type, expand_template(event_type, template))
+    return table
+
+TITLE_TABLE = build_title_table()
+
+def generate_titles(type_index):
+    """Generate one title per event, type_index holds indices into EVENT_TYPES"""
+    return TITLE_TABLE.lookup(TITLE_TABLE.sample(np_rng, EVENT_TYPES, type_index))
+
+def generate_title(event_type):
+    """Generate event title based on type"""
+    return generate_titles(np.array([EVENT_TYPES.index(event_type)]))[0]
+
+def generate_datetimes(count, now=None):
+    """Generate count random datetimes from tomorrow to 3 months from now (datetime64 array)"""
+    start_date = datetime_sampling.now_anchor(now).astype('datetime64[D]') + 1  # Start from tomorrow
+    return datetime_sampling.sample_datetimes(np_rng, count, start_date, EVENT_WINDOW_DAYS, EVENT_HOURS, EVENT_MINUTES)
 
-def generate_datetime():
+def generate_datetime(now=None):
     """Generate random datetime in next 3 months"""
-    now = datetime.now()
-    start_date = now + timedelta(days=1)  # Start from tomorrow
-    end_date = now + timedelta(days=90)   # 3 months from now
-    
-    # Random date in range
-    days_diff = (end_date - start_date).days
-    random_days = random.randint(0, days_diff)
-    event_date = start_date + timedelta(days=random_days)
-    
-    # Random time (usually evening events)
-    hour = random.choice([18, 19, 20, 21])
-    minute = random.choice([0, 15, 30, 45])
-    
-    return event_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return generate_datetimes(1, now)[0].item()
 
 def generate_event(event_id):
     """Generate single event"""
-    event_type = random.choice(EVENT_TYPES)
-    title = generate_title(event_type)
-    description = random.choice(DESCRIPTION_TEMPLATES)
-    datetime_start = generate_datetime()
-    provider = random.choice(PROVIDERS)
+    return generate_event_batch(event_id, 1)[0]
+
+def generate_event_batch(start_id, count, now=None):
+    """Generate events start_id..start_id + count - 1, drawing every field in bulk"""
+    type_index = np_rng.integers(0, len(EVENT_TYPES), count)
+    titles = generate_titles(type_index)
+    descriptions = np_rng.integers(0, len(DESCRIPTION_TEMPLATES), count).tolist()
+    datetimes = datetime_sampling.format_iso(generate_datetimes(count, now))
+    providers = np_rng.integers(0, len(PROVIDERS), count).tolist()
     
-    return {
-        'id': event_id,
-        'title': title,
-        'description': description,
-        'type': event_type,
-        'datetime_start': datetime_start.isoformat(),
-        'provider': provider
-    }
-
-def generate_events():
+    return [
+        {
+            'id': event_id,
+            'title': title,
+            'description': DESCRIPTION_TEMPLATES[description],
+            'type': EVENT_TYPES[event_type],
+            'datetime_start': datetime_start,
+            'provider': PROVIDERS[provider]
+        }
+        for event_id, event_type, title, description, datetime_start, provider in zip(
+            range(start_id, start_id + count), type_index.tolist(), titles, descriptions, datetimes, providers)
+    ]
+
+def generate_events(now=None, count=NUM_EVENTS, start_id=1):
     """Generate all events and return as JSON"""
-    events = []
-    
-    for event_id in range(1, NUM_EVENTS + 1):
-        if event_id % 1000 == 0:
-            print(f"Generating event {event_id}/{NUM_EVENTS}")
-        
-        event = generate_event(event_id)
-        events.append(event)
+    with instrumentation.stage('generate'):
+        events = generate_event_batch(start_id, count, now)
     
+    instrumentation.advance(count)
     return events
 
-if __name__ == "__main__":
-    print("Generating events data...")
-    events = generate_events()
-    
-    # Save to JSON file
-    with open('events.json', 'w', encoding='utf-8') as f:
+def save_events(events, path='events.json'):
+    with instrumentation.stage('io'), open(path, 'w', encoding='utf-8') as f:
         json.dump(events, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate upcoming events")
+    parser.add_argument('--count', type=int, default=None, help=f"number of events (default {NUM_EVENTS:,})")
+    parser.add_argument('--seed', type=int, default=None, help="random seed (default 42)")
+    parser.add_argument('--id-start', type=int, default=None, help="first event ID (default 1)")
+    parser.add_argument('--now', default=None,
+                        help="events start within 90 days after this date (default: the fixed 2025-08-15 anchor)")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser)
+    args = parser.parse_args()
+    profiles.apply(args, 'events', {'count': NUM_EVENTS, 'seed': 42, 'id_start': 1, 'now': None})
+    np_rng = np.random.default_rng(args.seed)
     
-    print(f"Generated {NUM_EVENTS} events and saved to events.json")
-    print("Sample events:")
-    for i in range(3):
-        event = events[i]
-        print(f"ID: {event['id']}")
-        print(f"Title: {event['title']}")
-        print(f"Type: {event['type']}")
-        print(f"Date: {event['datetime_start']}")
-        print(f"Provider: {event['provider']}")
-        print(f"Description: {event['description'][:100]}...")
-        print("-" * 50)
\ No newline at end of file
+    if args.dry_run:
+        # Every event is held in memory until the JSON array is written
+        profiles.dry_run('generate_events', args.count, lambda rows, directory: save_events(
+            generate_events(args.now, rows, args.id_start), f"{directory}/events.json"), sample_rows=args.dry_run)
+    else:
+        print("Generating events data...")
+        with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, 'events', args.count):
+            events = generate_events(args.now, args.count, args.id_start)
+            
+            # Save to JSON file
+            save_events(events)
+        
+        print(f"Generated {args.count} events and saved to events.json")
+        print("Sample events:")
+        for event in events[:3]:
+            print(f"ID: {event['id']}")
+            print(f"Title: {event['title']}")
+            print(f"Type: {event['type']}")
+            print(f"Date: {event['datetime_start']}")
+            print(f"Provider: {event['provider']}")
+            print(f"Description: {event['description'][:100]}...")
+            print("-" * 50)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Generate seat inventory for events: halls with sectors, rows, seats, price tiers and pre-sold occupancy.
+
+Every event from generate_events.py or events_archive.py gets a hall laid out
+from the template for its type (a cinema hall of a few hundred seats up to a
+four-stand stadium of ~100k). Seats are generated per event as a NumPy
+structured array (SEAT_DTYPE, 19 bytes per seat) rather than per-seat dicts,
+and written straight to the output, so memory depends on the largest hall and
+not on the number of rows: hundreds of millions of seats stream to disk.
+
+Occupancy fills the best seats first: seats are ranked by row (front first),
+distance from the middle of the row and some noise, the top share of them is
+sold and the next few are reserved.
+
+Each event is seeded with (seed, event id), so its seats do not depend on the
+other events in the file, the chunking or the number of worker processes.
+
+    python3 generate_inventory.py --events events.json --format copy --output event_seats.sql
+    psql -f event_seats.sql
+
+Binary output is loaded into an existing event_seats table (see SEATS_TABLE_DDL) with
+\\copy event_seats (event_id, seat_id, row_number, seat_number, price_tier, price, sector, status)
+    FROM 'event_seats.pgcopy' WITH (FORMAT binary)
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+import compression
+import instrumentation
+import pgcopy
+import profiles
+from insert_events_from_json import iter_events
+
+SEED = 42
+
+FORMATS = ("csv", "copy", "binary")
+
+DEFAULT_OUTPUTS = {"csv": "event_seats.csv", "copy": "event_seats.sql", "binary": "event_seats.pgcopy"}
+
+# Columns in output order; integer columns first so binary tuples start with a fixed-width block
+COLUMNS = ["event_id", "seat_id", "row_number", "seat_number", "price_tier", "price", "sector", "status"]
+
+SEATS_TABLE_DDL = """
+CREATE TABLE event_seats (
+    event_id INTEGER NOT NULL,
+    seat_id INTEGER NOT NULL,
+    row_number INTEGER NOT NULL,
+    seat_number INTEGER NOT NULL,
+    price_tier INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    sector VARCHAR(50) NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    PRIMARY KEY (event_id, seat_id)
+);
+"""
+
+# One seat; sector indexes the hall's sector names, status indexes STATUSES
+SEAT_DTYPE = np.dtype([
+    ("event_id", "<i4"),
+    ("seat_id", "<i4"),
+    ("sector", "u1"),
+    ("row", "<i2"),
+    ("number", "<i2"),
+    ("price_tier", "u1"),
+    ("price", "<i4"),
+    ("status", "u1"),
+])
+
+STATUSES = ["free", "reserved", "sold"]
+FREE, RESERVED, SOLD = range(len(STATUSES))
+
+# Hall templates: base price range and sectors as
+# (name, (min rows, max rows), (min seats per row, max seats per row), price multiplier)
+HALLS = {
+    "cinema": ((1500, 4000), [("Зал", (8, 20), (14, 30), 1.0)]),
+    "studio": ((1000, 3000), [("Студия", (5, 12), (10, 30), 1.0)]),
+    "theater": ((3000, 15000), [
+        ("Партер", (12, 25), (20, 40), 1.0),
+        ("Амфитеатр", (5, 10), (20, 40), 0.7),
+        ("Бельэтаж", (3, 6), (20, 36), 0.6),
+        ("Балкон", (3, 6), (20, 36), 0.4),
+    ]),
+    "arena": ((5000, 30000), [("Партер", (20, 40), (30, 60), 1.0)] +
+              [(f"Сектор {name}", (10, 30), (20, 50), 0.5) for name in "ABCDEFGH"]),
+    "stadium": ((2000, 20000), [
+        (f"Трибуна {name}", (20, 60), (100, 420), multiplier)
+        for name, multiplier in zip("ABCD", (1.0, 1.0, 0.7, 0.7))
+    ]),
+    "expo": ((500, 2500), [("Общий вход", (1, 1), (200, 2000), 1.0)]),
+}
+
+# Hall template per event type of generate_events.py and events_archive.py
+HALL_FOR_TYPE = {
+    "film": "cinema", "cinema": "cinema", "game": "studio", "stage": "theater", "theater": "theater",
+    "concert": "arena", "sport": "stadium", "exhibition": "expo",
+}
+DEFAULT_HALL = "theater"
+
+# Price multiplier of tiers 1-3; each sector's rows are split into thirds, front rows in tier 1
+TIER_MULTIPLIERS = np.array([1.0, 0.75, 0.5])
+
+# Occupancy ranking: weight of the distance from the middle of the row and of the noise,
+# relative to the row position (0 for the front row, 1 for the back row)
+CENTER_WEIGHT = 0.3
+RANK_NOISE = 0.15
+
+# Spread of the per-event sold share around --occupancy (Beta distribution concentration)
+OCCUPANCY_CONCENTRATION = 8.0
+
+# Seats per unit of work; events are grouped by their largest possible hall
+CHUNK_SEATS = 500_000
+
+def hall_for(event_type: str) -> str:
+    return HALL_FOR_TYPE.get(event_type, DEFAULT_HALL)
+
+def max_seats(hall: str) -> int:
+    """Largest number of seats a hall template can produce"""
+    return sum(rows[1] * seats[1] for _, rows, seats, _ in HALLS[hall][1])
+
+def sample_fill(rng, occupancy: float) -> float:
+    """Sold share of one event, Beta-distributed around occupancy"""
+    if occupancy <= 0 or occupancy >= 1:
+        return min(max(occupancy, 0.0), 1.0)
+    return rng.beta(occupancy * OCCUPANCY_CONCENTRATION, (1 - occupancy) * OCCUPANCY_CONCENTRATION)
+
+def generate_seats(event_id: int, event_type: str, seed: int = SEED, occupancy: float = 0.6,
+                   reserved_share: float = 0.02) -> Tuple[np.ndarray, List[str]]:
+    """Seats of one event as a SEAT_DTYPE array, with the names its sector codes refer to"""
+    rng = np.random.default_rng([seed, event_id])
+    (low_price, high_price), sectors = HALLS[hall_for(event_type)]
+    base_price = rng.integers(low_price, high_price + 1)
+
+    parts = []
+    for code, (name, (min_rows, max_rows), (min_seats, max_seats_per_row), multiplier) in enumerate(sectors):
+        rows = int(rng.integers(min_rows, max_rows + 1))
+        per_row = int(rng.integers(min_seats, max_seats_per_row + 1))
+        part = np.empty(rows * per_row, dtype=SEAT_DTYPE)
+        part["sector"] = code
+        part["row"] = np.repeat(np.arange(1, rows + 1), per_row)
+        part["number"] = np.tile(np.arange(1, per_row + 1), rows)
+        tier = (part["row"] - 1) * len(TIER_MULTIPLIERS) // rows
+        part["price_tier"] = tier + 1
+        part["price"] = np.maximum(np.round(base_price * multiplier * TIER_MULTIPLIERS[tier] / 100) * 100, 100)
+        parts.append((part, rows, per_row))
+
+    seats = np.concatenate([part for part, _, _ in parts])
+    seats["event_id"] = event_id
+    seats["seat_id"] = np.arange(1, len(seats) + 1)
+
+    # Front rows and middle seats first, across all sectors of the hall
+    rank = np.concatenate([
+        (part["row"] - 1) / max(rows - 1, 1) + CENTER_WEIGHT * np.abs(2 * part["number"] - per_row - 1) / per_row
+        for part, rows, per_row in parts
+    ]) + rng.normal(0, RANK_NOISE, len(seats))
+    order = np.argsort(rank, kind="stable")
+    sold = int(round(sample_fill(rng, occupancy) * len(seats)))
+    reserved = min(int(round(reserved_share * len(seats))), len(seats) - sold)
+    seats["status"] = FREE
+    seats["status"][order[:sold]] = SOLD
+    seats["status"][order[sold:sold + reserved]] = RESERVED
+    return seats, [name for name, _, _, _ in sectors]
+
+def format_text(seats: np.ndarray, sectors: List[str], separator: str) -> str:
+    """Seats of one event as CSV (separator ",") or COPY text (separator "\\t") lines; names need no escaping"""
+    if len(seats) == 0:
+        return ""
+    # Everything after seat_number depends only on (sector, row, status), so those
+    # line endings are formatted once per group and looked up for each seat
+    group = (seats["sector"].astype(np.int64) << 18) | (seats["row"].astype(np.int64) << 2) | seats["status"]
+    _, first, group_index = np.unique(group, return_index=True, return_inverse=True)
+    endings = [separator.join(["", str(tier), str(price), sectors[sector], STATUSES[status]]) + "\n"
+               for sector, tier, price, status in zip(*(seats[name][first].tolist()
+                                                        for name in ("sector", "price_tier", "price", "status")))]
+    endings = np.array(endings, dtype=object)[group_index].tolist()
+    rows = np.array([f"{separator}{row}{separator}" for row in range(int(seats["row"].max()) + 1)],
+                    dtype=object)[seats["row"]].tolist()
+    event = f"{int(seats['event_id'][0])}{separator}"
+    return "".join([f"{event}{seat_id}{row}{number}{ending}" for seat_id, row, number, ending in
+                    zip(map(str, seats["seat_id"].tolist()), rows, map(str, seats["number"].tolist()), endings)])
+
+def format_binary(seats: np.ndarray, sectors: List[str]) -> bytes:
+    """Seats as PGCOPY tuples (without the file header and trailer)"""
+    prefixes = pgcopy.encode_int4_prefixes(
+        [seats[name] for name in ("event_id", "seat_id", "row", "number", "price_tier", "price")], len(COLUMNS))
+    encode_text = pgcopy.BINARY_ENCODERS["text"]
+    sector_fields = [encode_text(name) for name in sectors]
+    status_fields = [encode_text(name) for name in STATUSES]
+    return b"".join([prefix + sector_fields[sector] + status_fields[status]
+                     for prefix, sector, status in zip(prefixes, seats["sector"].tolist(), seats["status"].tolist())])
+
+def format_seats(seats: np.ndarray, sectors: List[str], fmt: str) -> bytes:
+    if fmt == "binary":
+        return format_binary(seats, sectors)
+    return format_text(seats, sectors, "," if fmt == "csv" else "\t").encode("utf-8")
+
+def _generate_chunk(events: List[Tuple[int, str]], fmt: str, seed: int, occupancy: float,
+                    reserved_share: float) -> Tuple[bytes, int, int]:
+    # Runs in a worker process: returns the formatted rows of a group of events, the events and the rows
+    parts = []
+    rows = 0
+    for event_id, event_type in events:
+        seats, sectors = generate_seats(event_id, event_type, seed, occupancy, reserved_share)
+        parts.append(format_seats(seats, sectors, fmt))
+        rows += len(seats)
+    return b"".join(parts), len(events), rows
+
+def iter_event_chunks(events: Iterator[Dict], chunk_seats: int = CHUNK_SEATS) -> Iterator[List[Tuple[int, str]]]:
+    """Group (id, type) of events so each group has at most about chunk_seats seats"""
+    chunk = []
+    seats = 0
+    for event in events:
+        chunk.append((event["id"], event["type"]))
+        seats += max_seats(hall_for(event["type"]))
+        if seats >= chunk_seats:
+            yield chunk
+            chunk = []
+            seats = 0
+    if chunk:
+        yield chunk
+
+def iter_formatted(events: Iterator[Dict], fmt: str, seed: int, occupancy: float, reserved_share: float,
+                   workers: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Formatted seat rows per chunk of events, in event order"""
+    chunks = iter_event_chunks(events)
+    if workers <= 1:
+        for chunk in chunks:
+            yield _generate_chunk(chunk, fmt, seed, occupancy, reserved_share)
+        return
+
+    # Keep a bounded window of chunks in flight, like events_archive.iter_shards
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_generate_chunk, chunk, fmt, seed, occupancy, reserved_share))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_inventory(events: Iterator[Dict], output: str, fmt: str = "csv", seed: int = SEED, occupancy: float = 0.6,
+                    reserved_share: float = 0.02, workers: int = 1) -> Tuple[int, int]:
+    """Write the seats of all events to output, returning (events, seats)"""
+    with compression.open_output(output, "wb", workers=workers) as f:
+        if fmt == "csv":
+            f.write((",".join(COLUMNS) + "\n").encode("utf-8"))
+        elif fmt == "copy":
+            f.write((SEATS_TABLE_DDL + "\n" + pgcopy.copy_statement("event_seats", COLUMNS)).encode("utf-8"))
+        else:
+            f.write(pgcopy.BINARY_HEADER)
+
+        written_events = 0
+        rows = 0
+        formatted = iter_formatted(events, fmt, seed, occupancy, reserved_share, workers)
+        while True:
+            with instrumentation.stage("generate"):
+                chunk = next(formatted, None)
+            if chunk is None:
+                break
+            data, event_count, count = chunk
+            with instrumentation.stage("write"):
+                f.write(data)
+            written_events += event_count
+            rows += count
+            instrumentation.advance(count)
+
+        if fmt == "copy":
+            f.write(pgcopy.END_OF_DATA.encode("utf-8"))
+        elif fmt == "binary":
+            f.write(pgcopy.BINARY_TRAILER)
+    return written_events, rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seat inventory (sectors, rows, seats, prices, occupancy) for events")
+    parser.add_argument("--events", default="events.json",
+                        help="events file from generate_events.py or events_archive.py (JSON, JSONL or columnar)")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="csv, a psql script with COPY FROM STDIN, or PGCOPY binary data")
+    parser.add_argument("--output", default=None,
+                        help="output file (default event_seats.csv/.sql/.pgcopy by format, add .gz or .zst to compress)")
+    parser.add_argument("--seed", type=int, default=None, help=f"random seed (default {SEED})")
+    parser.add_argument("--occupancy", type=float, default=None,
+                        help="mean share of seats already sold per event (default 0.6)")
+    parser.add_argument("--reserved-share", type=float, default=None,
+                        help="share of seats held in unpaid reservations (default 0.02)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser, sample_rows=2_000, unit="events")
+    args = parser.parse_args()
+    profiles.apply(args, "inventory", {"seed": SEED, "occupancy": 0.6, "reserved_share": 0.02})
+    output = args.output or DEFAULT_OUTPUTS[args.format]
+    
+    if args.dry_run:
+        # Seats are streamed in chunks, so memory does not grow with the event count
+        events = list(iter_events(args.events))
+        profiles.dry_run("generate_inventory", len(events), lambda count, directory: write_inventory(
+            iter(events[:count]), os.path.join(directory, os.path.basename(output)), args.format, args.seed,
+            args.occupancy, args.reserved_share, 1), resident_rows=1, workers=args.workers, sample_rows=args.dry_run,
+            unit="events", stream=sys.stderr)
+        return
+
+    print(f"Generating seat inventory for {args.events} into {output}...", file=sys.stderr)
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "inventory"):
+        events, seats = write_inventory(iter_events(args.events), output, args.format, args.seed, args.occupancy,
+                                        args.reserved_share, args.workers)
+    print(f"Wrote {seats:,} seats for {events:,} events to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Generate persons.csv: people with addresses, balances and bank cards.
+
+Python port of generate.fsx. Reference files (first_names.csv, last_names.csv,
+cities.csv, streets.csv and banks.csv) are loaded once per process, persons are
+drawn in vectorized NumPy batches, and card numbers are Luhn-valid numbers on
+real Kazakhstan BIN prefixes from banks.csv. Shards of SHARD_SIZE persons are
+seeded with seed + shard index and can be generated on a process pool; output
+is streamed to CSV in ID order and is identical for any number of workers.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+import compression
+import instrumentation
+import profiles
+import reference_data
+
+NUM_PERSONS = 1_000_000
+
+# Persons per shard; shard boundaries do not depend on the worker count
+SHARD_SIZE = 100_000
+
+FEMALE_SHARE = 0.51
+MAX_BALANCE = 1_000_000
+
+EXPIRY_YEARS = (2025, 2029)
+
+# Card number length per network, 16 for everything else
+CARD_LENGTHS = {"AMERICAN EXPRESS": 15}
+
+HEADER = ["Sex", "FirstName", "LastName", "CardNumber", "ExpMonth", "ExpYear", "CCV", "Balance", "City", "Address"]
+
+_reference: Optional[Dict] = None
+
+def load_reference() -> Dict:
+    """Load the reference tables once per process (see reference_data.py)"""
+    global _reference
+    if _reference is None:
+        first_names = reference_data.by_sex(reference_data.table("first_names"))
+        last_names = reference_data.by_sex(reference_data.table("last_names"))
+        banks = reference_data.table("banks")
+        _reference = {
+            # Names by sex, using the English spelling as generate.fsx does
+            "first_names": {sex: first_names[sex]["NameEn"] for sex in "MF"},
+            "last_names": {sex: last_names[sex]["NameEn"] for sex in "MF"},
+            "cities": reference_data.table("cities")["CityEn"],
+            "streets": reference_data.table("streets")["StreetNameEn"],
+            "bin_digits": np.array([[int(digit) for digit in bin_] for bin_ in banks["BIN"]], dtype=np.int64),
+            "card_lengths": np.array([CARD_LENGTHS.get(network, 16) for network in banks["Network"]]),
+        }
+    return _reference
+
+def luhn_check_digits(payload: np.ndarray) -> np.ndarray:
+    """Check digit for each row of a digit matrix (the number without its check digit)"""
+    # Counting from the right of the payload, every first, third, ... digit is doubled
+    doubled = payload[:, ::-1].copy()
+    doubled[:, ::2] *= 2
+    doubled[doubled > 9] -= 9
+    return (10 - doubled.sum(axis=1) % 10) % 10
+
+def generate_card_numbers(rng, count: int) -> List[str]:
+    """Luhn-valid card numbers on random BINs from banks.csv"""
+    reference = load_reference()
+    bank = rng.integers(0, len(reference["bin_digits"]), count)
+    lengths = reference["card_lengths"][bank]
+    random_digits = rng.integers(0, 10, (count, 16 - 7))
+    
+    numbers = np.empty(count, dtype=object)
+    for length in np.unique(lengths).tolist():
+        rows = np.flatnonzero(lengths == length)
+        payload = np.hstack([reference["bin_digits"][bank[rows]], random_digits[rows, :length - 7]])
+        digits = np.hstack([payload, luhn_check_digits(payload)[:, None]])
+        text = (digits + ord("0")).astype(np.uint8).tobytes().decode("ascii")
+        numbers[rows] = [text[i:i + length] for i in range(0, len(text), length)]
+    return numbers.tolist()
+
+def _sample(rng, names_by_sex: Dict[str, np.ndarray], is_female: np.ndarray) -> np.ndarray:
+    female, male = names_by_sex["F"], names_by_sex["M"]
+    picks = np.where(is_female,
+                     female[rng.integers(0, len(female), len(is_female))],
+                     male[rng.integers(0, len(male), len(is_female))])
+    return picks
+
+def generate_persons_batch(rng, count: int) -> Dict[str, list]:
+    """Generate count persons as columns"""
+    reference = load_reference()
+    is_female = rng.random(count) < FEMALE_SHARE
+    
+    cities = reference["cities"][rng.integers(0, len(reference["cities"]), count)]
+    streets = reference["streets"][rng.integers(0, len(reference["streets"]), count)]
+    houses = rng.integers(0, 100, count).tolist()
+    apartments = rng.integers(0, 200, count).tolist()
+    
+    return {
+        "Sex": np.where(is_female, "F", "M").tolist(),
+        "FirstName": _sample(rng, reference["first_names"], is_female).tolist(),
+        "LastName": _sample(rng, reference["last_names"], is_female).tolist(),
+        "CardNumber": generate_card_numbers(rng, count),
+        "ExpMonth": rng.integers(1, 13, count).tolist(),
+        "ExpYear": rng.integers(EXPIRY_YEARS[0], EXPIRY_YEARS[1] + 1, count).tolist(),
+        "CCV": [f"{ccv:03d}" for ccv in rng.integers(0, 999, count).tolist()],
+        "Balance": (rng.random(count) * MAX_BALANCE).astype(np.int64).tolist(),
+        "City": cities.tolist(),
+        "Address": [f"{street} {house} apt. {apartment}" for street, house, apartment in zip(streets, houses, apartments)],
+    }
+
+def format_csv(batch: Dict[str, list]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(zip(*(batch[column] for column in HEADER)))
+    return buffer.getvalue()
+
+def generate_shard(seed: int, count: int) -> str:
+    """CSV text for one shard"""
+    return format_csv(generate_persons_batch(np.random.default_rng(seed), count))
+
+def iter_shards(count: int, seed: int, workers: int, shard_size: int = SHARD_SIZE) -> Iterator[str]:
+    """CSV text of every shard, in order"""
+    tasks = [(seed + shard_index, min(shard_size, count - offset))
+             for shard_index, offset in enumerate(range(0, count, shard_size))]
+    
+    if workers <= 1:
+        for task in tasks:
+            yield generate_shard(*task)
+        return
+    
+    # Keep a bounded window of shards in flight and yield them in order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(generate_shard, *task))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def generate_csv(filename: str, count: int, seed: int, workers: int) -> None:
+    shards = iter_shards(count, seed, workers)
+    with compression.open_output(filename, "w", newline="") as f:
+        f.write(",".join(HEADER) + "\n")
+        while True:
+            with instrumentation.stage("generate"):
+                text = next(shards, None)
+            if text is None:
+                break
+            with instrumentation.stage("io"):
+                f.write(text)
+            instrumentation.advance(text.count("\n"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate persons with bank cards")
+    parser.add_argument("--count", type=int, default=None, help=f"number of persons (default {NUM_PERSONS:,})")
+    parser.add_argument("--seed", type=int, default=None, help="master seed (random if omitted)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--output", default="persons.csv", help="output file; a .gz or .zst suffix compresses it")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser)
+    args = parser.parse_args()
+    profiles.apply(args, "persons", {"count": NUM_PERSONS, "seed": None})
+    
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2**32)
+    if args.dry_run:
+        name = os.path.basename(args.output)
+        profiles.dry_run("generate_persons", args.count, lambda rows, directory: generate_csv(
+            os.path.join(directory, name), rows, seed, 1), resident_rows=SHARD_SIZE, workers=args.workers,
+            sample_rows=args.dry_run)
+        return
+    print(f"Generating {args.count:,} persons with {args.workers} workers (seed {seed})...")
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "persons", args.count):
+        generate_csv(args.output, args.count, seed, args.workers)
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Generate a stream of booking requests for load tests (requests.jsonl).
+
+Sessions arrive as a Poisson process whose rate follows a configurable curve
+(constant, ramp, spike or sine). Each session belongs to a user from users.csv
+and targets one event picked with Zipf-skewed popularity, so a few events
+become hot spots. A session searches one or more times, may reserve seats and
+then either pays or cancels, with exponential think time between steps.
+
+Events come from generate_events.py output (any format insert_events_from_json
+can read) and/or an archive ID range. Users come from users.csv or a columnar
+users dataset. Output is one JSON request per line, ordered by time offset "t"
+in seconds. Memory depends on the arrival rate and think time, not on the
+number of lines, and the stream is fully determined by --seed.
+"""
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import columnar
+import compression
+import instrumentation
+import profiles
+from insert_events_from_json import iter_events
+
+CURVES = ("constant", "ramp", "spike", "sine")
+
+# Sessions drawn per vectorized chunk
+SESSION_CHUNK = 10_000
+
+class Credentials:
+    """user_id, email and plain password by index, stored compactly"""
+
+    def __init__(self, path: str):
+        if columnar.is_columnar(path):
+            self.dataset = columnar.ColumnarDataset(path)
+            self.user_ids = self.dataset.column("user_id")
+            return
+        
+        self.dataset = None
+        user_ids = []
+        blob = bytearray()
+        offsets = [0]
+        with compression.open_input(path, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                user_ids.append(int(row["user_id"]))
+                # email and password are stored back to back, separated by a NUL byte
+                blob += row["email"].encode("utf-8") + b"\0" + row["password_plain"].encode("utf-8")
+                offsets.append(len(blob))
+        self.user_ids = np.array(user_ids, dtype=np.int64)
+        self.blob = bytes(blob)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def get(self, index: int) -> Tuple[int, str, str]:
+        if self.dataset is not None:
+            return (int(self.user_ids[index]), self.dataset.value("email", index),
+                    self.dataset.value("password_plain", index))
+        email, password = self.blob[self.offsets[index]:self.offsets[index + 1]].decode("utf-8").split("\0")
+        return int(self.user_ids[index]), email, password
+
+class EventPool:
+    """Event IDs from a file plus an optional archive range, ranked for Zipf sampling
+
+    Popularity rank r maps to an event through a multiplicative permutation,
+    so hot events are spread over the pool without materializing it.
+    """
+
+    def __init__(self, event_ids: np.ndarray, archive_range: Optional[Tuple[int, int]], exponent: float, rng):
+        self.event_ids = event_ids
+        self.archive_start, self.archive_count = (archive_range[0], archive_range[1] - archive_range[0] + 1) if archive_range else (0, 0)
+        self.size = len(event_ids) + self.archive_count
+        if self.size == 0:
+            raise ValueError("no events: pass --events and/or --archive-range")
+        self.exponent = exponent
+        
+        # Multiplier coprime with the pool size
+        multiplier = int(rng.integers(1, self.size)) | 1 if self.size > 1 else 1
+        while math.gcd(multiplier, self.size) != 1:
+            multiplier += 2
+        self.multiplier = multiplier
+        self.offset = int(rng.integers(0, self.size))
+
+    def sample_ranks(self, rng, count: int) -> np.ndarray:
+        """Zero-based Zipf ranks, by inverting the continuous power-law CDF on [1, size + 1)"""
+        u = rng.random(count)
+        n = self.size + 1.0
+        if abs(self.exponent - 1.0) < 1e-9:
+            x = n ** u
+        else:
+            a = 1.0 - self.exponent
+            x = (1.0 + u * (n ** a - 1.0)) ** (1.0 / a)
+        return np.minimum(x.astype(np.int64) - 1, self.size - 1)
+
+    def sample(self, rng, count: int) -> np.ndarray:
+        index = (self.sample_ranks(rng, count) * self.multiplier + self.offset) % self.size
+        from_file = index < len(self.event_ids)
+        ids = np.empty(count, dtype=np.int64)
+        ids[from_file] = self.event_ids[index[from_file]]
+        ids[~from_file] = self.archive_start + index[~from_file] - len(self.event_ids)
+        return ids
+
+def rate_at(t: np.ndarray, curve: str, rate: float, peak: float, duration: float) -> np.ndarray:
+    """Session arrival rate (per second) at time offsets t"""
+    if curve == "constant":
+        return np.full_like(t, rate)
+    if curve == "ramp":
+        return rate + (rate * peak - rate) * np.clip(t / duration, 0.0, 1.0)
+    if curve == "spike":
+        # Base rate with a burst of peak x rate in the middle tenth of the run
+        in_spike = np.abs(t - duration / 2) < duration / 20
+        return np.where(in_spike, rate * peak, rate)
+    # sine: one full cycle between rate and peak x rate over the run
+    return rate + (rate * peak - rate) * (1 - np.cos(2 * np.pi * t / duration)) / 2
+
+def expected_sessions(curve: str, rate: float, peak: float, duration: float) -> int:
+    """Mean number of sessions arriving over duration"""
+    t = np.linspace(0.0, duration, 10_001)
+    return int(round(float(np.mean(rate_at(t, curve, rate, peak, duration))) * duration))
+
+def iter_arrivals(rng, curve: str, rate: float, peak: float, duration: float) -> Iterator[np.ndarray]:
+    """Chunks of increasing session start times, by thinning a Poisson process at the maximum rate"""
+    max_rate = rate * max(peak, 1.0) if curve != "constant" else rate
+    t = 0.0
+    while t < duration:
+        candidates = t + np.cumsum(rng.exponential(1.0 / max_rate, SESSION_CHUNK))
+        t = float(candidates[-1])
+        candidates = candidates[candidates < duration]
+        accepted = candidates[rng.random(len(candidates)) * max_rate < rate_at(candidates, curve, rate, peak, duration)]
+        if len(accepted):
+            yield accepted
+
+def session_requests(session: int, start: float, user: Tuple[int, str, str], event_id: int,
+                     searches: int, seats: int, reserves: bool, pays: bool, think: np.ndarray) -> List[Tuple[float, Dict]]:
+    """The requests of one session as (time offset, request) pairs"""
+    user_id, email, password = user
+    auth = {"email": email, "password": password}
+    requests = []
+    t = start
+    step = 0
+    
+    def add(kind: str, method: str, path: str, body: Optional[Dict] = None):
+        nonlocal t, step
+        request = {"t": round(t, 6), "session": session, "step": step, "type": kind, "user_id": user_id,
+                   "event_id": event_id, "method": method, "path": path, "auth": auth}
+        if body is not None:
+            request["body"] = body
+        requests.append((t, request))
+        t += float(think[step])
+        step += 1
+    
+    for page in range(1, searches + 1):
+        add("search", "GET", f"/api/events?event_id={event_id}&page={page}&pageSize=20")
+    if reserves:
+        reservation = f"r{session}"
+        add("reserve", "POST", "/api/reservations", {"reservation_id": reservation, "event_id": event_id, "seats": seats})
+        if pays:
+            add("pay", "POST", "/api/payments", {"reservation_id": reservation, "event_id": event_id, "seats": seats})
+        else:
+            add("cancel", "DELETE", f"/api/reservations/{reservation}")
+    return requests
+
+def generate_requests(out, events: EventPool, users: Credentials, rng, curve: str, rate: float, peak: float,
+                      duration: float, think_time: float, reserve_share: float, pay_share: float,
+                      max_sessions: Optional[int] = None) -> int:
+    """Write the request stream in time order and return the number of lines"""
+    pending: List[Tuple[float, int, Dict]] = []
+    written = 0
+    sequence = 0
+    session = 0
+    
+    def emit_until(limit: float):
+        nonlocal written
+        lines = []
+        while pending and pending[0][0] <= limit:
+            lines.append(json.dumps(heapq.heappop(pending)[2], ensure_ascii=False))
+        if lines:
+            with instrumentation.stage("io"):
+                out.write("\n".join(lines) + "\n")
+            written += len(lines)
+            instrumentation.advance(len(lines))
+    
+    for starts in iter_arrivals(rng, curve, rate, peak, duration):
+        if max_sessions is not None:
+            starts = starts[:max_sessions - session]
+        count = len(starts)
+        if not count:
+            break
+        with instrumentation.stage("random"):
+            event_ids = events.sample(rng, count).tolist()
+            user_index = rng.integers(0, len(users), count).tolist()
+            searches = rng.integers(1, 4, count).tolist()
+            seats = rng.integers(1, 5, count).tolist()
+            reserves = (rng.random(count) < reserve_share).tolist()
+            pays = (rng.random(count) < pay_share).tolist()
+            think = rng.exponential(think_time, (count, 5))
+        
+        with instrumentation.stage("format"):
+            for i, start in enumerate(starts.tolist()):
+                for t, request in session_requests(session, start, users.get(user_index[i]), event_ids[i],
+                                                   searches[i], seats[i], reserves[i], pays[i], think[i]):
+                    heapq.heappush(pending, (t, sequence, request))
+                    sequence += 1
+                session += 1
+        
+        # Sessions in later chunks start after this chunk, so everything up to
+        # the last start time here is final
+        emit_until(float(starts[-1]))
+        if max_sessions is not None and session >= max_sessions:
+            break
+    
+    emit_until(math.inf)
+    return written
+
+def parse_range(value: str) -> Tuple[int, int]:
+    first, _, last = value.partition(":")
+    return int(first), int(last)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a JSONL stream of booking requests")
+    parser.add_argument("--events", help="events file from generate_events.py (JSON, JSONL or columnar)")
+    parser.add_argument("--archive-range", type=parse_range, metavar="FIRST:LAST",
+                        help="also target archive event IDs, e.g. 100000:6099999")
+    parser.add_argument("--users", default="users.csv", help="users.csv or a columnar users dataset")
+    parser.add_argument("--output", default="requests.jsonl",
+                        help="output file, - for stdout; a .gz or .zst suffix compresses it")
+    parser.add_argument("--seed", type=int, default=None, help="random seed (default 42)")
+    parser.add_argument("--rate", type=float, default=None, help="base session arrival rate per second (default 100)")
+    parser.add_argument("--curve", choices=CURVES, default=None, help="shape of the arrival rate over time (default constant)")
+    parser.add_argument("--peak", type=float, default=None,
+                        help="peak rate as a multiple of --rate for non-constant curves (default 5)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds of traffic to generate (default 3600)")
+    parser.add_argument("--sessions", type=int, default=None, help="stop after this many sessions")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of event popularity")
+    parser.add_argument("--think-time", type=float, default=5.0, help="mean seconds between a session's requests")
+    parser.add_argument("--reserve-share", type=float, default=0.4, help="share of sessions that reserve seats")
+    parser.add_argument("--pay-share", type=float, default=0.7, help="share of reservations that are paid (others cancel)")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser, sample_rows=10_000, unit="sessions")
+    args = parser.parse_args()
+    profiles.apply(args, "requests", {"seed": 42, "rate": 100.0, "curve": "constant", "peak": 5.0, "duration": 3600.0,
+                                      "sessions": None})
+    if args.sessions is not None and args.sessions < 1:
+        parser.error("--sessions must be at least 1")
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.peak < 1:
+        parser.error("--peak must be at least 1")
+    if args.zipf < 0:
+        parser.error("--zipf must not be negative (0 picks events uniformly)")
+    
+    rng = np.random.default_rng(args.seed)
+    event_ids = np.array([event["id"] for event in iter_events(args.events)], dtype=np.int64) if args.events else np.zeros(0, np.int64)
+    pool = EventPool(event_ids, args.archive_range, args.zipf, rng)
+    users = Credentials(args.users)
+    print(f"Generating requests for {pool.size:,} events and {len(users):,} users...", file=sys.stderr)
+    
+    if args.dry_run:
+        def run_sample(sessions, directory):
+            sample_rng = np.random.default_rng(args.seed)
+            sample_pool = EventPool(event_ids, args.archive_range, args.zipf, sample_rng)
+            name = "requests.jsonl" if args.output == "-" else os.path.basename(args.output)
+            with compression.open_output(os.path.join(directory, name)) as out:
+                generate_requests(out, sample_pool, users, sample_rng, args.curve, args.rate, args.peak, args.duration,
+                                  args.think_time, args.reserve_share, args.pay_share, sessions)
+        sessions = expected_sessions(args.curve, args.rate, args.peak, args.duration)
+        if args.sessions is not None:
+            sessions = min(sessions, args.sessions)
+        # Requests wait in a heap for at most a think-time window, a small part of the run
+        profiles.dry_run("generate_requests", sessions, run_sample, resident_rows=1, sample_rows=args.dry_run,
+                         unit="sessions", stream=sys.stderr)
+        return
+    
+    out = sys.stdout if args.output == "-" else compression.open_output(args.output)
+    try:
+        with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "requests"):
+            written = generate_requests(out, pool, users, rng, args.curve, args.rate, args.peak, args.duration,
+                                        args.think_time, args.reserve_share, args.pay_share, args.sessions)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Wrote {written:,} requests to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,63 @@
 # before running this script, make sure to install the required libraries:
-# python3 -m pip install pandas numpy
+# python3 -m pip install numpy
 # This script generates a large dataset of user information for a ticketing system.
 # It creates a CSV file and an SQL script to insert the data into a database.
+# Both files are written from a single generation pass, so they hold identical rows.
 # The dataset includes user IDs, emails, hashed passwords, names, birthdays, registration dates,
 # active status, and last login dates.
+#
+# Users are generated in batches: every field is drawn as a whole NumPy column per batch
+# instead of one row at a time, which keeps the 1,000,000-user run to a few seconds.
 
-import random
-import string
-import hashlib
 import csv
-import datetime
+import os
+import sys
+import argparse
+from collections import deque
 import numpy as np
-import pandas as pd
 
-# Set random seed for reproducibility
-random.seed(42)
-np.random.seed(42)
+import checkpoints
+import columnar
+import compression
+import datetime_sampling
+import instrumentation
+import passwords
+import pgcopy
+import profiles
+import reference_data
+
+# Seed for reproducibility
+SEED = 42
 
 # Number of users to generate
 NUM_USERS = 1000000
 
+# Number of users generated per batch
+BATCH_SIZE = 50000
+
 # Domain names for emails
 DOMAINS = ['cool.ti', 'grab.coffee', 'hackhload.kz', 'ticket.world', 'event.me', 
            'quick.pass', 'show.go', 'concert.fun', 'fest.tix', 'live.now']
 
-# Read first names and last names from CSV files
-first_names_df = pd.read_csv('first_names.csv')
-last_names_df = pd.read_csv('last_names.csv')
+# Batches generated ahead while earlier batches are still being hashed
+PIPELINE_DEPTH = 2
 
-# Separate names by gender
-male_first_names = first_names_df[first_names_df['Sex'] == 'M']
-female_first_names = first_names_df[first_names_df['Sex'] == 'F']
-male_last_names = last_names_df[last_names_df['Sex'] == 'M']
-female_last_names = last_names_df[last_names_df['Sex'] == 'F']
+# Checkpoint file of --checkpoint, --resume and --append
+CHECKPOINT = 'users.checkpoint'
 
-# Function to capitalize the first letter and lowercase the rest
-def format_name(name):
-    if not name:
-        return name
-    return name[0].upper() + name[1:].lower()
+# Columns of users.csv, in order
+FIELDNAMES = ['user_id', 'email', 'password_hash', 'password_plain', 'first_name', 
+              'surname', 'birthday', 'registered_at', 'is_active', 'last_logged_in']
 
-# Function to generate a user's first name, last name, and email consistent by gender
-def generate_name_and_email(user_id):
-    # Determine gender
-    gender = 'M' if random.random() < 0.5 else 'F'
-    
-    if gender == 'M':
-        # Select a random male name
-        first_name_row = male_first_names.sample(1).iloc[0]
-        last_name_row = male_last_names.sample(1).iloc[0]
-    else:
-        # Select a random female name
-        first_name_row = female_first_names.sample(1).iloc[0]
-        last_name_row = female_last_names.sample(1).iloc[0]
-    
-    # Get the appropriate name versions
-    first_name_kz = first_name_row['NameKZ']
-    first_name_en = first_name_row['NameEn']
-    last_name_kz = last_name_row['NameKZ']
-    last_name_en = last_name_row['NameEn']
-    
-    # Format the KZ names
-    formatted_first_name = format_name(first_name_kz)
-    formatted_last_name = format_name(last_name_kz)
-    
-    # Generate email using English names
-    email = f"{first_name_en.lower()}_{last_name_en.lower()}_{user_id}@{random.choice(DOMAINS)}"
-    
-    return formatted_first_name, formatted_last_name, email, gender
-
-# Function to generate a password and its hash
-def generate_password():
-    # Generate a random password
-    length = random.randint(8, 16)
-    chars = string.ascii_letters + string.digits + string.punctuation
-    password = ''.join(random.choice(chars) for _ in range(length))
-    
-    # Hash the password
-    hashed = hashlib.sha256(password.encode()).hexdigest()
-    
-    return password, hashed
-
-# Function to generate a birthdate (or None with 30% probability)
-def generate_birthdate():
-    if random.random() < 0.3:  # 30% chance of None
-        return None
-    
-    # Calculate date range for ages 13-65
-    today = datetime.datetime.now()
-    min_date = today - datetime.timedelta(days=65*365)
-    max_date = today - datetime.timedelta(days=13*365)
-    
-    # Generate random date within range
-    days_range = (max_date - min_date).days
-    random_days = random.randint(0, days_range)
-    return min_date + datetime.timedelta(days=random_days)
-
-# Function to generate registration date
-def generate_registration_date():
-    # Registration between 1 and 5 years ago
-    now = datetime.datetime.now()
-    days_ago = random.randint(1, 5*365)
-    return now - datetime.timedelta(days=days_ago)
-
-# Function to generate last login date (after registration)
-def generate_last_login(registration_date):
-    now = datetime.datetime.now()
-    # Last login between registration and now
-    days_since_reg = (now - registration_date).days
-    if days_since_reg <= 0:
-        days_since_reg = 1
-    days_after_reg = random.randint(0, days_since_reg)
-    return registration_date + datetime.timedelta(days=days_after_reg)
+# PostgreSQL types of the users columns, in FIELDNAMES order
+COLUMN_TYPES = ['int4', 'text', 'text', 'text', 'text', 'text', 'date', 'timestamp', 'bool', 'timestamp']
 
-# Generate CSV file
-def generate_csv():
-    with open('users.csv', 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['user_id', 'email', 'password_hash', 'password_plain', 'first_name', 
-                     'surname', 'birthday', 'registered_at', 'is_active', 'last_logged_in']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for user_id in range(1, NUM_USERS + 1):
-            if user_id % 10000 == 0:  # Progress indicator
-                print(f"Generating user {user_id}/{NUM_USERS}")
-            
-            # Generate user data
-            first_name, surname, email, _ = generate_name_and_email(user_id)
-            password_plain, password_hash = generate_password()
-            birthday = generate_birthdate()
-            registered_at = generate_registration_date()
-            is_active = random.random() < 0.8  # 80% chance of being active
-            last_logged_in = generate_last_login(registered_at)
-            
-            # Write to CSV
-            writer.writerow({
-                'user_id': user_id,
-                'email': email,
-                'password_hash': password_hash,
-                'password_plain': password_plain,
-                'first_name': first_name,
-                'surname': surname,
-                'birthday': birthday.strftime('%Y-%m-%d') if birthday else None,
-                'registered_at': registered_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_active': is_active,
-                'last_logged_in': last_logged_in.strftime('%Y-%m-%d %H:%M:%S')
-            })
-
-# Generate SQL script
-def generate_sql():
-    with open('users.sql', 'w', encoding='utf-8') as sqlfile:
-        # Write SQL table creation
-        sqlfile.write("""
+# CREATE TABLE statement; password_hash is widened for salted hash formats
+USERS_TABLE_DDL = """
 CREATE TABLE users (
     user_id INTEGER PRIMARY KEY,
     email VARCHAR(255) UNIQUE NOT NULL,
-    password_hash VARCHAR(64) NOT NULL,
+    password_hash VARCHAR({password_hash_length}) NOT NULL,
     password_plain VARCHAR(255),  -- For testing purposes only, would not exist in production
     first_name VARCHAR(100) NOT NULL,
     surname VARCHAR(100) NOT NULL,
@@ -164,56 +66,458 @@ CREATE TABLE users (
     is_active BOOLEAN NOT NULL,
     last_logged_in TIMESTAMP NOT NULL
 );
+"""
 
--- Insert data
-BEGIN TRANSACTION;
-""")
-        
-        # Process in batches to avoid memory issues
-        batch_size = 1000
-        total_batches = NUM_USERS // batch_size
-        
-        for batch in range(total_batches):
-            start_id = batch * batch_size + 1
-            end_id = (batch + 1) * batch_size
-            
-            if batch % 10 == 0:  # Progress indicator
-                print(f"Generating SQL batch {batch+1}/{total_batches}")
-            
-            batch_values = []
-            for user_id in range(start_id, end_id + 1):
-                # Generate user data (same as CSV function)
-                first_name, surname, email, _ = generate_name_and_email(user_id)
-                password_plain, password_hash = generate_password()
-                birthday = generate_birthdate()
-                registered_at = generate_registration_date()
-                is_active = random.random() < 0.8
-                last_logged_in = generate_last_login(registered_at)
-                
-                # Format SQL values - escape single quotes in names and other strings
-                first_name_sql = first_name.replace("'", "''")
-                surname_sql = surname.replace("'", "''")
-                email_sql = email.replace("'", "''")
-                password_plain_sql = password_plain.replace("'", "''")
-                
-                birth_sql = f"'{birthday.strftime('%Y-%m-%d')}'" if birthday else "NULL"
-                is_active_sql = "TRUE" if is_active else "FALSE"
-                
-                value = f"({user_id}, '{email_sql}', '{password_hash}', '{password_plain_sql}', '{first_name_sql}', '{surname_sql}', {birth_sql}, '{registered_at.strftime('%Y-%m-%d %H:%M:%S')}', {is_active_sql}, '{last_logged_in.strftime('%Y-%m-%d %H:%M:%S')}')"
-                batch_values.append(value)
+# Read first names and last names, split by gender (see reference_data.py)
+first_names_by_sex = reference_data.by_sex(reference_data.table('first_names'))
+last_names_by_sex = reference_data.by_sex(reference_data.table('last_names'))
+
+# Function to capitalize the first letter and lowercase the rest
+def format_name(name):
+    if not name:
+        return name
+    return name[0].upper() + name[1:].lower()
+
+# Function to turn gender-split names into lookup arrays.
+# Male names come first, so a name index is offset + position within the gender.
+def build_name_table(names_by_sex):
+    male, female = names_by_sex['M'], names_by_sex['F']
+    return {
+        'kz': np.array([format_name(name) for name in [*male['NameKZ'], *female['NameKZ']]], dtype=object),
+        'en': np.array([name.lower() for name in [*male['NameEn'], *female['NameEn']]], dtype=object),
+        'offset': np.array([0, len(male['NameKZ'])]),
+        'size': np.array([len(male['NameKZ']), len(female['NameKZ'])]),
+    }
+
+first_name_table = build_name_table(first_names_by_sex)
+last_name_table = build_name_table(last_names_by_sex)
+
+DOMAINS_ARRAY = np.array(DOMAINS, dtype=object)
+
+# Function to draw name indices for a batch, consistent with each user's gender
+# (gender_index is 0 for male and 1 for female)
+def sample_names(rng, name_table, gender_index):
+    sizes = name_table['size'][gender_index]
+    positions = (rng.random(len(gender_index)) * sizes).astype(np.int64)
+    return name_table['offset'][gender_index] + positions
+
+# Function to generate a batch of users as whole columns.
+# Dates are datetime64 arrays, birthdays are NaT where missing. With
+# hash_passwords=False password_hash is left as None for a PasswordStage to fill.
+def generate_users_batch(rng, start_id, count, now, hash_passwords=True):
+    now = np.datetime64(now, 's')
+    today = now.astype('datetime64[D]')
+    user_ids = np.arange(start_id, start_id + count, dtype=np.int64)
+    
+    # Determine gender (0 = male, 1 = female) and pick consistent names
+    gender_index = (rng.random(count) >= 0.5).astype(np.int64)
+    first_index = sample_names(rng, first_name_table, gender_index)
+    last_index = sample_names(rng, last_name_table, gender_index)
+    domains = DOMAINS_ARRAY[rng.integers(0, len(DOMAINS), count)]
+    
+    # Generate emails using English names
+    emails = [
+        f"{first}_{last}_{user_id}@{domain}"
+        for first, last, user_id, domain in zip(
+            first_name_table['en'][first_index], last_name_table['en'][last_index],
+            user_ids.tolist(), domains)
+    ]
+    
+    plain_passwords = passwords.generate_passwords(rng, count)
+    hashes = passwords.hash_chunk(passwords.Sha256Hasher(), plain_passwords, b'') if hash_passwords else None
+    
+    # Birthday for ages 13-65, or None with 30% probability
+    birthday_missing = rng.random(count) < 0.3
+    birthdays = datetime_sampling.sample_dates(rng, count, today - 65 * 365, (65 - 13) * 365 + 1)
+    birthdays[birthday_missing] = np.datetime64('NaT')
+    
+    # Registration between 1 and 5 years ago
+    days_ago = datetime_sampling.sample_day_offsets(rng, count, 1, 5 * 365)
+    registered_at = now - days_ago.astype('timedelta64[D]')
+    
+    is_active = rng.random(count) < 0.8  # 80% chance of being active
+    
+    # Last login between registration and now
+    days_after_reg = datetime_sampling.sample_day_offsets(rng, count, 0, days_ago)
+    last_logged_in = registered_at + days_after_reg.astype('timedelta64[D]')
+    
+    return {
+        'user_id': user_ids,
+        'email': emails,
+        'password_hash': hashes,
+        'password_plain': plain_passwords,
+        'first_name': first_name_table['kz'][first_index],
+        'surname': last_name_table['kz'][last_index],
+        'birthday': birthdays,
+        'registered_at': registered_at,
+        'is_active': is_active,
+        'last_logged_in': last_logged_in,
+    }
+
+# Function to turn a batch into row tuples in FIELDNAMES order
+def batch_rows(batch):
+    return zip(
+        batch['user_id'].tolist(),
+        batch['email'],
+        batch['password_hash'],
+        batch['password_plain'],
+        batch['first_name'].tolist(),
+        batch['surname'].tolist(),
+        datetime_sampling.format_dates(batch['birthday']),
+        datetime_sampling.format_timestamps(batch['registered_at']),
+        batch['is_active'].tolist(),
+        datetime_sampling.format_timestamps(batch['last_logged_in']),
+    )
+
+# Generator yielding batches for user IDs start_id..num_users.
+# Dates are relative to now, the fixed datetime_sampling.NOW anchor by default.
+# A resumed run passes the generator restored from its checkpoint as rng.
+def iter_user_batches(num_users=NUM_USERS, batch_size=BATCH_SIZE, seed=SEED, now=None, hash_passwords=True,
+                      rng=None, start_id=1):
+    rng = rng or np.random.default_rng(seed)
+    now = datetime_sampling.now_anchor(now)
+    
+    for start_id in range(start_id, num_users + 1, batch_size):
+        count = min(batch_size, num_users + 1 - start_id)
+        with instrumentation.stage('random'):
+            batch = generate_users_batch(rng, start_id, count, now, hash_passwords)
+        yield batch
+
+# Function to format one row tuple as SQL VALUES - escape single quotes in names and other strings
+def format_sql_values(row):
+    user_id, email, password_hash, password_plain, first_name, surname, birthday, registered_at, is_active, last_logged_in = row
+    
+    first_name_sql = first_name.replace("'", "''")
+    surname_sql = surname.replace("'", "''")
+    email_sql = email.replace("'", "''")
+    password_plain_sql = password_plain.replace("'", "''")
+    
+    birth_sql = f"'{birthday}'" if birthday else "NULL"
+    is_active_sql = "TRUE" if is_active else "FALSE"
+    
+    return f"({user_id}, '{email_sql}', '{password_hash}', '{password_plain_sql}', '{first_name_sql}', '{surname_sql}', {birth_sql}, '{registered_at}', {is_active_sql}, '{last_logged_in}')"
+
+# Base class for pipeline outputs. The pipeline generates every batch once and
+# hands it to each sink, so all outputs describe exactly the same users.
+# open() gets the dict returned by checkpoint() when a run is resumed and must
+# then continue the existing output instead of starting a new one.
+class UserSink:
+    # Width of the password_hash column, set by run_pipeline from the hasher
+    password_hash_length = 64
+    file = None
+    
+    def open(self, state=None):
+        pass
+    
+    # batch is the column dict from generate_users_batch, rows the formatted tuples
+    def write_batch(self, batch, rows):
+        raise NotImplementedError
+    
+    # Flush written batches to disk and return what open() needs to resume here
+    def checkpoint(self):
+        return {'size': checkpoints.synced_size(self.file)}
+    
+    def close(self):
+        pass
+
+# Sink writing users.csv
+class CsvSink(UserSink):
+    def __init__(self, path='users.csv'):
+        self.path = path
+        self.file = None
+        self.writer = None
+    
+    def open(self, state=None):
+        if state is not None:
+            self.file = checkpoints.reopen(self.path, state['size'], 'a', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            return
+        self.file = compression.open_output(self.path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDNAMES)
+    
+    def write_batch(self, batch, rows):
+        self.writer.writerows(rows)
+    
+    def close(self):
+        self.file.close()
+
+# Sink writing users.sql as CREATE TABLE plus multi-row INSERT statements
+class SqlSink(UserSink):
+    def __init__(self, path='users.sql', insert_size=1000):
+        self.path = path
+        # Each INSERT statement covers this many rows
+        self.insert_size = insert_size
+        self.file = None
+    
+    def open(self, state=None):
+        if state is not None:
+            self.file = checkpoints.reopen(self.path, state['size'], 'a', encoding='utf-8')
+            return
+        self.file = compression.open_output(self.path, 'w')
+        # Write SQL table creation
+        self.file.write(USERS_TABLE_DDL.format(password_hash_length=self.password_hash_length))
+        self.file.write("\n-- Insert data\nBEGIN TRANSACTION;\n")
+    
+    def write_batch(self, batch, rows):
+        for start in range(0, len(rows), self.insert_size):
+            batch_values = [format_sql_values(row) for row in rows[start:start + self.insert_size]]
             
             # Write batch insert
-            sqlfile.write("INSERT INTO users (user_id, email, password_hash, password_plain, first_name, surname, birthday, registered_at, is_active, last_logged_in) VALUES\n")
-            sqlfile.write(",\n".join(batch_values))
-            sqlfile.write(";\n")
-        
+            self.file.write("INSERT INTO users (user_id, email, password_hash, password_plain, first_name, surname, birthday, registered_at, is_active, last_logged_in) VALUES\n")
+            self.file.write(",\n".join(batch_values))
+            self.file.write(";\n")
+    
+    def close(self):
         # Close transaction
-        sqlfile.write("\nCOMMIT;\n")
+        self.file.write("\nCOMMIT;\n")
+        self.file.close()
+
+# Sink writing a psql script that loads users with COPY FROM STDIN (text format)
+class CopySink(UserSink):
+    def __init__(self, path='users_copy.sql'):
+        self.path = path
+        self.file = None
+    
+    def open(self, state=None):
+        if state is not None:
+            self.file = checkpoints.reopen(self.path, state['size'], 'a', encoding='utf-8')
+            return
+        self.file = compression.open_output(self.path, 'w')
+        self.file.write(USERS_TABLE_DDL.format(password_hash_length=self.password_hash_length))
+        self.file.write("\n")
+        self.file.write(pgcopy.copy_statement('users', FIELDNAMES))
+    
+    def write_batch(self, batch, rows):
+        self.file.writelines(pgcopy.format_copy_row(row) for row in rows)
+    
+    def close(self):
+        self.file.write(pgcopy.END_OF_DATA)
+        self.file.close()
+
+# Sink writing PGCOPY binary data, loaded with
+# \copy users FROM 'users.pgcopy' WITH (FORMAT binary)
+class BinaryCopySink(UserSink):
+    def __init__(self, path='users.pgcopy'):
+        self.path = path
+        self.file = None
+        self.writer = None
+    
+    def open(self, state=None):
+        if state is not None:
+            self.file = checkpoints.reopen(self.path, state['size'])
+            self.writer = pgcopy.BinaryCopyWriter(self.file, COLUMN_TYPES, header=False)
+            return
+        self.file = compression.open_output(self.path, 'wb')
+        self.writer = pgcopy.BinaryCopyWriter(self.file, COLUMN_TYPES)
+    
+    def write_batch(self, batch, rows):
+        # Dates and timestamps are converted to PostgreSQL epoch offsets in bulk
+        birthdays = batch['birthday']
+        birthday_days = (birthdays - np.datetime64(pgcopy.PG_EPOCH_DATE, 'D')).astype(np.int64).tolist()
+        birthday_days = [None if missing else days for missing, days in zip(np.isnat(birthdays).tolist(), birthday_days)]
+        epoch = np.datetime64(pgcopy.PG_EPOCH, 'us')
+        registered_at = (batch['registered_at'] - epoch).astype(np.int64).tolist()
+        last_logged_in = (batch['last_logged_in'] - epoch).astype(np.int64).tolist()
+        
+        self.writer.write_rows(zip(
+            batch['user_id'].tolist(),
+            batch['email'],
+            batch['password_hash'],
+            batch['password_plain'],
+            batch['first_name'].tolist(),
+            batch['surname'].tolist(),
+            birthday_days,
+            registered_at,
+            batch['is_active'].tolist(),
+            last_logged_in,
+        ))
+    
+    def close(self):
+        self.writer.close()
+        self.file.close()
+
+# Sink writing a memory-mappable columnar dataset (see columnar.py)
+class ColumnarSink(UserSink):
+    def __init__(self, path='users.cols'):
+        self.path = path
+        self.writer = None
+    
+    def open(self, state=None):
+        self.writer = columnar.ColumnarWriter(self.path, columnar.USERS_SCHEMA, state)
+    
+    def write_batch(self, batch, rows):
+        self.writer.append(batch)
+    
+    def checkpoint(self):
+        return self.writer.checkpoint()
+    
+    def close(self):
+        self.writer.close()
+
+# Output formats selectable from the command line
+SINKS = {
+    'csv': CsvSink,
+    'sql': SqlSink,
+    'copy': CopySink,
+    'binary': BinaryCopySink,
+    'columnar': ColumnarSink,
+}
+
+# Generate users once and fan every batch out to all sinks as it arrives.
+# Passwords are hashed by password_stage (inline SHA-256 by default) while the
+# next batches are generated.
+#
+# With checkpoint_path set, a checkpoint holding the next user ID, the RNG state
+# after the last written batch and every sink's checkpoint() is saved after each
+# batch. Passing that checkpoint back as resume_state continues the run, giving
+# the same output as an uninterrupted one; settings are extra values stored in it.
+# User IDs run from start_id to num_users.
+def run_pipeline(sinks, num_users=NUM_USERS, batch_size=BATCH_SIZE, seed=SEED, now=None, password_stage=None,
+                 checkpoint_path=None, resume_state=None, settings=None, start_id=1):
+    stage = password_stage or passwords.PasswordStage(seed=seed)
+    for sink in sinks:
+        sink.password_hash_length = stage.hasher.max_length
+    
+    rng = np.random.default_rng(seed)
+    state = dict(settings or {}, seed=seed, num_users=num_users, batch_size=batch_size,
+                 now=str(datetime_sampling.now_anchor(now)), next_id=start_id, rng=None, sinks=None, complete=False)
+    if resume_state is not None:
+        state.update(next_id=resume_state['next_id'], rng=resume_state['rng'], sinks=resume_state['sinks'])
+        if state['rng'] is not None:
+            rng.bit_generator.state = state['rng']
+    
+    def save_checkpoint():
+        with instrumentation.stage('checkpoint'):
+            state['sinks'] = [sink.checkpoint() for sink in sinks]
+            checkpoints.save(checkpoint_path, state)
+    
+    def write(batch, pending_hashes, rng_state):
+        with instrumentation.stage('hash'):
+            batch['password_hash'] = pending_hashes.result()
+        with instrumentation.stage('format'):
+            rows = list(batch_rows(batch))
+        with instrumentation.stage('io'):
+            for sink in sinks:
+                sink.write_batch(batch, rows)
+        if checkpoint_path:
+            state.update(next_id=int(batch['user_id'][-1]) + 1, rng=rng_state)
+            save_checkpoint()
+        instrumentation.advance(len(rows))
+    
+    opened = []
+    try:
+        with stage:
+            sink_states = state['sinks'] or [None] * len(sinks)
+            for sink, sink_state in zip(sinks, sink_states):
+                sink.open(sink_state)
+                opened.append(sink)
+            
+            pending = deque()
+            batches = iter_user_batches(num_users, batch_size, seed, now, hash_passwords=False,
+                                        rng=rng, start_id=state['next_id'])
+            for batch in batches:
+                with instrumentation.stage('hash'):
+                    handle = stage.submit(batch['password_plain'], int(batch['user_id'][0]))
+                # rng is paused right after this batch, which is where a resumed run continues
+                pending.append((batch, handle, rng.bit_generator.state))
+                if len(pending) > PIPELINE_DEPTH:
+                    write(*pending.popleft())
+            while pending:
+                write(*pending.popleft())
+            
+            if checkpoint_path:
+                state['complete'] = True
+                save_checkpoint()
+    finally:
+        for sink in opened:
+            sink.close()
+
+# Generate CSV file
+def generate_csv():
+    run_pipeline([CsvSink()])
+
+# Generate SQL script
+def generate_sql():
+    run_pipeline([SqlSink()])
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate users for the ticketing system")
+    parser.add_argument('--format', action='append', choices=list(SINKS), dest='formats',
+                        help="output to write, may be repeated (default: csv and sql)")
+    parser.add_argument('--password-hash', default='sha256',
+                        help="password hash scheme: sha256, pbkdf2[:iterations], scrypt[:n] or bcrypt[:rounds]")
+    parser.add_argument('--hash-workers', type=int, default=passwords.default_workers(),
+                        help="processes hashing passwords, 0 to hash inline")
+    parser.add_argument('--now', default=None,
+                        help="reference date for registration and login dates (default: the fixed 2025-08-15 anchor)")
+    parser.add_argument('--count', type=int, default=None, help=f"number of users (default: {NUM_USERS:,})")
+    parser.add_argument('--seed', type=int, default=None, help=f"random seed (default: {SEED})")
+    parser.add_argument('--id-start', type=int, default=None, help="first user ID (default: 1)")
+    parser.add_argument('--compress', choices=['gz', 'zst'], default=None,
+                        help="compress the csv, sql, copy and binary outputs (users.csv.gz, ...)")
+    parser.add_argument('--checkpoint', nargs='?', const=CHECKPOINT, default=None, metavar='FILE',
+                        help=f"save a checkpoint after every batch, for --resume and --append (default file: {CHECKPOINT})")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its checkpoint (settings come from the checkpoint)")
+    resume.add_argument('--append', type=int, default=0, metavar='N',
+                        help="extend finished outputs with N new users, keeping the existing ones")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser)
+    args = parser.parse_args()
+    profiles.apply(args, 'users', {'count': NUM_USERS, 'seed': SEED, 'id_start': 1, 'now': None})
+    
+    num_users = args.id_start + args.count - 1
+    resume_state = None
+    if args.resume or args.append:
+        args.checkpoint = args.checkpoint or CHECKPOINT
+        resume_state = checkpoints.load(args.checkpoint)
+        if resume_state is None:
+            parser.error(f"no checkpoint found at {args.checkpoint}")
+        if args.append:
+            if not resume_state['complete']:
+                parser.error("the previous run did not finish; complete it with --resume before appending")
+        # Outputs, hashing and dates must match the run being continued
+        args.formats = resume_state['formats']
+        args.compress = resume_state.get('compress')
+        args.password_hash = resume_state['password_hash']
+        args.now = resume_state['now']
+        args.seed = resume_state['seed']
+        num_users = resume_state['num_users'] + args.append
+        print(f"Resuming at user {resume_state['next_id']:,} of {num_users:,}...")
+    formats = args.formats or ['csv', 'sql']
+    try:
+        hasher = passwords.make_hasher(args.password_hash)
+    except (ValueError, RuntimeError) as e:
+        parser.error(f"--password-hash: {e}")
+    
+    if args.dry_run:
+        # Only the batches in the pipeline are held in memory
+        def run_sample(rows, directory):
+            sinks = [SINKS[name]() for name in formats]
+            for sink in sinks:
+                sink.path = os.path.join(directory, os.path.basename(sink.path))
+                if args.compress and not isinstance(sink, ColumnarSink):
+                    sink.path += '.' + args.compress
+            stage = passwords.PasswordStage(hasher, args.hash_workers, args.seed)
+            run_pipeline(sinks, args.id_start + rows - 1, seed=args.seed, now=args.now, password_stage=stage,
+                         start_id=args.id_start)
+        profiles.dry_run('generate_ticket_users', args.count, run_sample,
+                         resident_rows=BATCH_SIZE * (PIPELINE_DEPTH + 1), sample_rows=args.dry_run)
+        sys.exit(0)
+    
     print("Generating user data...")
-    print("Generating CSV file...")
-    generate_csv()
-    print("Generating SQL file...")
-    generate_sql()
-    print("Done!")
\ No newline at end of file
+    print(f"Writing {', '.join(formats)} output with {args.password_hash} password hashes...")
+    stage = passwords.PasswordStage(hasher, args.hash_workers, args.seed)
+    settings = {'formats': formats, 'password_hash': args.password_hash, 'compress': args.compress}
+    sinks = [SINKS[name]() for name in formats]
+    for sink in sinks:
+        if args.compress and not isinstance(sink, ColumnarSink):
+            sink.path += '.' + args.compress
+    total = num_users + 1 - (resume_state['next_id'] if resume_state else args.id_start)
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, 'users', total):
+        run_pipeline(sinks, num_users, seed=args.seed, now=args.now, password_stage=stage,
+                     checkpoint_path=args.checkpoint, resume_state=resume_state, settings=settings,
+                     start_id=args.id_start)
+    print("Done!")
@@ -1,70 +1,422 @@
 #!/usr/bin/env python3
+import argparse
+import contextlib
+import io
 import json
+import os
+import stat
 import sys
-from typing import List, Dict
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+import columnar
+import compression
+import instrumentation
+import pgcopy
+
+# Characters read from the input file at a time
+READ_CHUNK_SIZE = 1 << 20
+
+# Output formats: multi-row INSERT statements, COPY text data or PGCOPY binary data
+FORMATS = ("insert", "copy", "binary")
+
+EVENT_COLUMNS = ["id", "title", "description", "type", "datetime_start", "provider"]
+EVENT_COLUMN_TYPES = ["int4", "text", "text", "text", "timestamp", "text"]
 
 def escape_sql_string(value: str) -> str:
     """Escape single quotes in SQL strings"""
     return value.replace("'", "''")
 
-def generate_insert_statements(events: List[Dict], batch_size: int = 1000) -> None:
-    """Generate SQL INSERT statements for events data"""
+def iter_events_from_stream(stream: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict]:
+    """Parse events incrementally from a JSON array or JSONL stream"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+    
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+    
+    if not skip_whitespace():
+        return
+    
+    if buffer[pos] != "[":
+        # JSONL: one event per line
+        while True:
+            end = buffer.find("\n", pos)
+            if end == -1:
+                if not eof and fill():
+                    continue
+                end = len(buffer)
+            line = buffer[pos:end].strip()
+            if line:
+                yield json.loads(line)
+            pos = end + 1
+            if pos >= len(buffer) and (eof or not fill()):
+                return
+    
+    # JSON array: decode one element at a time
+    pos += 1
+    while True:
+        if not skip_whitespace():
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        if buffer[pos] == ",":
+            pos += 1
+            continue
+        try:
+            event, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element may continue in the next chunk
+            if fill():
+                continue
+            raise
+        if end == len(buffer) and not eof and fill():
+            continue
+        pos = end
+        yield event
+
+def iter_events(json_file: str) -> Iterator[Dict]:
+    """Stream events from a JSON array or JSONL file, or a columnar archive directory"""
+    if columnar.is_columnar(json_file):
+        yield from columnar.iter_event_dicts(columnar.ColumnarDataset(json_file))
+        return
+    with compression.open_input(json_file) as f:
+        yield from iter_events_from_stream(f)
+
+def iter_batches(events: Iterable[Dict], batch_size: int) -> Iterator[list]:
+    """Group an event stream into lists of at most batch_size events"""
+    iterator = iter(events)
+    while True:
+        with instrumentation.stage("read"):
+            batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def generate_insert_statements(events: Iterable[Dict], batch_size: int = 1000) -> Tuple[int, int, int]:
+    """Generate SQL INSERT statements for events data, returning (count, first id, last id)"""
     
     print("-- Generated SQL INSERT statements for events_archive")
     print("-- Archive events: 6 million events with IDs 100,000 to 6,099,999")
     print("-- Date range: 2015-2024 (past 10 years)")
+    print(f"-- Batch size: {batch_size:,}")
     print()
     
-    total_events = len(events)
-    batches = (total_events + batch_size - 1) // batch_size
+    total_events = 0
+    first_id = last_id = None
+    
+    for batch_num, batch_events in enumerate(iter_batches(events, batch_size)):
+        start_idx = total_events
+        total_events += len(batch_events)
+        if first_id is None:
+            first_id = batch_events[0]['id']
+        last_id = batch_events[-1]['id']
+        
+        with instrumentation.stage("format"):
+            values = []
+            for event in batch_events:
+                title = escape_sql_string(event['title'])
+                description = escape_sql_string(event['description'])
+                event_type = escape_sql_string(event['type'])
+                provider = escape_sql_string(event['provider'])
+                
+                value = f"({event['id']}, '{title}', '{description}', '{event_type}', '{event['datetime_start']}', '{provider}')"
+                values.append(value)
+            
+            statement = (f"-- Batch {batch_num + 1} (events {start_idx + 1} to {total_events})\n"
+                         "INSERT INTO events_archive (id, title, description, type, datetime_start, provider) VALUES\n"
+                         + ",\n".join(values) + "\n;\n\n")
+        
+        with instrumentation.stage("io"):
+            sys.stdout.write(statement)
+        instrumentation.advance(len(batch_events))
     
     print(f"-- Total events: {total_events:,}")
-    print(f"-- Batch size: {batch_size:,}")
-    print(f"-- Total batches: {batches}")
-    print()
+    return total_events, first_id, last_id
+
+def event_values(event: Dict) -> list:
+    """Return the column values of an event in EVENT_COLUMNS order"""
+    return [event['id'], event['title'], event['description'], event['type'], event['datetime_start'], event['provider']]
+
+def generate_copy_data(events: Iterable[Dict], binary: bool = False) -> Tuple[int, int, int]:
+    """Generate PostgreSQL COPY data for events, returning (count, first id, last id)
     
-    for batch_num in range(batches):
-        start_idx = batch_num * batch_size
-        end_idx = min(start_idx + batch_size, total_events)
-        batch_events = events[start_idx:end_idx]
-        
-        print(f"-- Batch {batch_num + 1} of {batches} (events {start_idx + 1} to {end_idx})")
-        print("INSERT INTO events_archive (id, title, description, type, datetime_start, provider) VALUES")
+    Text format is a psql script with the COPY statement and inline data.
+    Binary format is raw PGCOPY data for COPY ... FROM STDIN WITH (FORMAT binary).
+    """
+    total_events = 0
+    first_id = last_id = None
+    
+    if binary:
+        sys.stdout.flush()
+        writer = pgcopy.BinaryCopyWriter(sys.stdout.buffer, EVENT_COLUMN_TYPES)
+    else:
+        print("-- Generated COPY data for events_archive")
+        sys.stdout.write(pgcopy.copy_statement("events_archive", EVENT_COLUMNS))
+    
+    for batch_events in iter_batches(events, 1000):
+        if first_id is None:
+            first_id = batch_events[0]['id']
+        last_id = batch_events[-1]['id']
+        total_events += len(batch_events)
         
-        values = []
-        for event in batch_events:
-            title = escape_sql_string(event['title'])
-            description = escape_sql_string(event['description'])
-            event_type = escape_sql_string(event['type'])
-            provider = escape_sql_string(event['provider'])
-            
-            value = f"({event['id']}, '{title}', '{description}', '{event_type}', '{event['datetime_start']}', '{provider}')"
-            values.append(value)
+        if binary:
+            with instrumentation.stage("write"):
+                writer.write_rows(event_values(event) for event in batch_events)
+        else:
+            with instrumentation.stage("format"):
+                text = "".join([pgcopy.format_copy_row(event_values(event)) for event in batch_events])
+            with instrumentation.stage("io"):
+                sys.stdout.write(text)
+        instrumentation.advance(len(batch_events))
+    
+    if binary:
+        writer.close()
+        sys.stdout.buffer.flush()
+    else:
+        sys.stdout.write(pgcopy.END_OF_DATA)
+    
+    return total_events, first_id, last_id
+
+# Bytes scanned per read while indexing event lines
+INDEX_CHUNK_SIZE = 64 << 20
+
+def index_event_lines(json_file: str) -> Optional[np.ndarray]:
+    """Byte offsets of every event in a file holding one event per line, else None
+
+    events_archive.py writes JSON arrays and JSONL with one compact event per
+    line; an event starts wherever a line starts with '{'. Raw newlines cannot
+    occur inside JSON strings, so a byte scan finds them without parsing.
+    Compressed and indented files, and files without such lines, are not
+    indexed and return None.
+    """
+    if compression.codec_for(json_file) or columnar.is_columnar(json_file):
+        return None
+    
+    starts = []
+    previous = b"\n"
+    with open(json_file, "rb") as f:
+        base = 0
+        while True:
+            chunk = f.read(INDEX_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = np.frombuffer(previous + chunk, dtype=np.uint8)
+            # Positions in data are one byte ahead of the chunk because of previous
+            found = np.flatnonzero((data[:-1] == ord("\n")) & (data[1:] == ord("{")))
+            starts.append(found + base)
+            base += len(chunk)
+            previous = chunk[-1:]
         
-        print(",\n".join(values))
-        print(";")
-        print()
+        offsets = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+        if not len(offsets):
+            return None
+        # The first line after an opening '[' must hold a whole event; indented
+        # JSON spreads one over several lines, with or without '{' at column 0
+        f.seek(0)
+        line = b""
+        for line in f:
+            line = line.strip()
+            if line and line != b"[":
+                break
+        try:
+            if not isinstance(json.loads(line.rstrip(b",")), dict):
+                return None
+        except json.JSONDecodeError:
+            return None
+    return offsets
+
+def iter_event_lines(json_file: str, offset: int, count: int) -> Iterator[Dict]:
+    """Parse count one-line events starting at a byte offset from index_event_lines"""
+    with open(json_file, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if count == 0:
+                return
+            line = line.strip()
+            if line.startswith(b"{"):
+                yield json.loads(line.rstrip(b","))
+                count -= 1
+
+def part_path(pattern: str, index: int) -> str:
+    """events.sql.gz -> events_001.sql.gz"""
+    directory, name = os.path.split(pattern)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, f"{stem}_{index + 1:03d}{dot}{extensions}")
+
+class _ByteCounter(io.RawIOBase):
+    """Counts bytes on their way to a raw file, which also works for named pipes"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        written = self.raw.write(data)
+        self.bytes += written
+        return written
+
+    def close(self) -> None:
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+def write_part(json_file: str, fmt: str, batch_size: int, path: str, start: int, count: int,
+               offset: Optional[int]) -> Dict:
+    """Write events [start, start + count) to one file or named pipe, in its own transaction"""
+    began = time.perf_counter()
+    if columnar.is_columnar(json_file):
+        events = columnar.iter_event_dicts(columnar.ColumnarDataset(json_file), first=start, last=start + count)
+    elif offset is not None:
+        events = iter_event_lines(json_file, offset, count)
+    else:
+        events = islice(iter_events(json_file), start, start + count)
+    
+    counter = None
+    if compression.codec_for(path):
+        out = compression.open_output(path)
+    else:
+        counter = _ByteCounter(open(path, "wb", buffering=0))
+        out = io.TextIOWrapper(io.BufferedWriter(counter), encoding="utf-8")
+    
+    with out, contextlib.redirect_stdout(out):
+        # PGCOPY data is loaded by a single \copy, which is already one transaction
+        if fmt != "binary":
+            print("BEGIN;")
+        if fmt == "insert":
+            total_events, first_id, last_id = generate_insert_statements(events, batch_size)
+        else:
+            total_events, first_id, last_id = generate_copy_data(events, binary=fmt == "binary")
+        if fmt != "binary":
+            print("COMMIT;")
+    
+    return {
+        "file": path,
+        "rows": total_events,
+        "bytes": counter.bytes if counter else os.path.getsize(path),
+        "first_id": first_id,
+        "last_id": last_id,
+        "seconds": round(time.perf_counter() - began, 3),
+    }
+
+def write_split(json_file: str, fmt: str, batch_size: int, files: int, pattern: str,
+                jobs: Optional[int] = None, fifo: bool = False) -> List[Dict]:
+    """Split the events into files contiguous ID ranges written by parallel worker processes
+
+    Pass 1 counts the events (and indexes line offsets when possible), pass 2
+    gives every part to a worker, which reads only its own range when the
+    input is indexed or columnar. With fifo the parts are named pipes, written
+    as soon as a reader (e.g. psql -f) opens them, so every part needs a worker.
+    """
+    with instrumentation.stage("index"):
+        offsets = index_event_lines(json_file)
+        if offsets is not None:
+            total = len(offsets)
+        elif columnar.is_columnar(json_file):
+            total = len(columnar.ColumnarDataset(json_file))
+        else:
+            total = sum(1 for _ in iter_events(json_file))
+    
+    bounds = [total * i // files for i in range(files + 1)]
+    paths = [part_path(pattern, i) for i in range(files)]
+    if os.path.dirname(pattern):
+        os.makedirs(os.path.dirname(pattern), exist_ok=True)
+    if fifo:
+        for path in paths:
+            if not (os.path.exists(path) and stat.S_ISFIFO(os.stat(path).st_mode)):
+                os.mkfifo(path)
+        jobs = files
+        print(f"-- Waiting for readers on {', '.join(paths)}", file=sys.stderr)
+    jobs = jobs or min(files, os.cpu_count() or 1)
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(write_part, json_file, fmt, batch_size, path, bounds[i], bounds[i + 1] - bounds[i],
+                            None if offsets is None or bounds[i] == bounds[i + 1] else int(offsets[bounds[i]]))
+            for i, path in enumerate(paths)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            instrumentation.advance(result["rows"])
+            print(f"-- {result['file']}: {result['rows']:,} rows, {result['bytes']:,} bytes, "
+                  f"IDs {result['first_id']} to {result['last_id']} in {result['seconds']:.1f}s", file=sys.stderr)
+    
+    written = sum(result["rows"] for result in results)
+    if written != total:
+        raise RuntimeError(f"split files hold {written:,} events, expected {total:,}")
+    return sorted(results, key=lambda result: result["file"])
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 insert_events_from_json.py <json_file>")
-        print("Example: python3 insert_events_from_json.py events_archive.json")
-        print("To generate SQL file: python3 insert_events_from_json.py events_archive.json > insert_statements.sql")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Generate SQL for loading events from a JSON array or JSONL file (read incrementally)",
+        epilog="To generate SQL file: python3 insert_events_from_json.py events_archive.json > insert_statements.sql")
+    parser.add_argument("json_file", help="events file, e.g. events_archive.json")
+    parser.add_argument("--format", choices=FORMATS, default="insert",
+                        help="INSERT statements (default), COPY text script or PGCOPY binary data")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT statement")
+    parser.add_argument("--output", default=None,
+                        help="write to this file instead of stdout; a .gz or .zst suffix compresses it")
+    parser.add_argument("--files", type=int, default=1,
+                        help="split into this many files with disjoint ID ranges, one transaction each, "
+                             "named after --output (default events_archive.sql): events_archive_001.sql, ...")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for --files (default: CPU count)")
+    parser.add_argument("--fifo", action="store_true", help="with --files, create named pipes instead of regular files")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
     
-    json_file = sys.argv[1]
+    json_file = args.json_file
     
     try:
-        print(f"-- Reading events from {json_file}...", file=sys.stderr)
-        with open(json_file, 'r', encoding='utf-8') as f:
-            events = json.load(f)
+        print(f"-- Streaming events from {json_file}...", file=sys.stderr)
         
-        print(f"-- Loaded {len(events):,} events", file=sys.stderr)
-        print(f"-- ID range: {events[0]['id']} to {events[-1]['id']}", file=sys.stderr)
-        print(f"-- Generating SQL INSERT statements...", file=sys.stderr)
+        if args.files > 1:
+            pattern = args.output or ("events_archive.pgcopy" if args.format == "binary" else "events_archive.sql")
+            with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "insert_events"):
+                results = write_split(json_file, args.format, args.batch_size, args.files, pattern, args.jobs, args.fifo)
+            print(f"-- Wrote {sum(result['rows'] for result in results):,} events, "
+                  f"{sum(result['bytes'] for result in results):,} bytes to {len(results)} files", file=sys.stderr)
+            return
         
-        generate_insert_statements(events, batch_size=1000)
+        output = compression.open_output(args.output) if args.output else contextlib.nullcontext(sys.stdout)
+        with output as out, contextlib.redirect_stdout(out), \
+                instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "insert_events"):
+            if args.format == "insert":
+                print(f"-- Generating SQL INSERT statements...", file=sys.stderr)
+                total_events, first_id, last_id = generate_insert_statements(iter_events(json_file), batch_size=args.batch_size)
+            else:
+                print(f"-- Generating COPY {args.format} data...", file=sys.stderr)
+                total_events, first_id, last_id = generate_copy_data(iter_events(json_file), binary=args.format == "binary")
         
+        print(f"-- Processed {total_events:,} events", file=sys.stderr)
+        print(f"-- ID range: {first_id} to {last_id}", file=sys.stderr)
         print(f"-- SQL generation complete!", file=sys.stderr)
         
     except FileNotFoundError:
@@ -78,4 +430,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Progress, stage timing and profiling shared by the generator scripts.
+
+A script creates one Tracker for its run and activates it with `with tracker:`.
+Code anywhere in the run then reports through the module-level helpers, which
+do nothing when no tracker is active:
+
+    with instrumentation.stage("format"):
+        rows = list(batch_rows(batch))
+    instrumentation.advance(len(rows))
+
+While active, the tracker prints rows/sec, ETA, peak memory and the split of
+time between stages to stderr every few seconds, prints a summary at the end,
+and can write a machine-readable JSON trace. profiled() wraps a run in
+cProfile.
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_active: Optional["Tracker"] = None
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class Tracker:
+    """Counts rows and accumulates time per stage for one run"""
+
+    def __init__(self, name: str, total: Optional[int] = None, interval: float = 2.0,
+                 trace_path: Optional[str] = None, stream: TextIO = sys.stderr, quiet: bool = False):
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.trace_path = trace_path
+        self.stream = stream
+        self.quiet = quiet
+        self.rows = 0
+        self.stages: Dict[str, float] = {}
+        self.samples: List[Dict] = []
+        self.started = None
+        self.last_report = None
+        self._previous: Optional[Tracker] = None
+
+    def __enter__(self) -> "Tracker":
+        global _active
+        self._previous, _active = _active, self
+        self.started = self.last_report = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global _active
+        _active = self._previous
+        self.finish()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def advance(self, rows: int) -> None:
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        elapsed = (now or time.perf_counter()) - self.started
+        return {
+            "seconds": round(elapsed, 3),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / elapsed, 1) if elapsed > 0 else None,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def _stage_split(self) -> str:
+        spent = sum(self.stages.values())
+        if not spent:
+            return ""
+        parts = [f"{name} {seconds / spent:.0%}" for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1])]
+        return " | " + " ".join(parts)
+
+    def report(self, now: Optional[float] = None) -> None:
+        sample = self.snapshot(now)
+        self.samples.append(sample)
+        if self.quiet:
+            return
+        
+        rate = sample["rows_per_sec"] or 0
+        progress = f"{self.rows:,}"
+        eta = ""
+        if self.total:
+            progress += f"/{self.total:,} ({self.rows / self.total:.1%})"
+            if rate:
+                eta = f" ETA {_format_duration((self.total - self.rows) / rate)}"
+        memory = f" peak {sample['peak_rss_bytes'] / 2**20:,.0f} MB" if sample["peak_rss_bytes"] else ""
+        print(f"[{self.name}] {progress} rows {rate:,.0f} rows/s{eta}{memory}{self._stage_split()}",
+              file=self.stream, flush=True)
+
+    def finish(self) -> None:
+        summary = self.snapshot()
+        if not self.quiet:
+            memory = f", peak {summary['peak_rss_bytes'] / 2**20:,.0f} MB" if summary["peak_rss_bytes"] else ""
+            print(f"[{self.name}] done: {self.rows:,} rows in {_format_duration(summary['seconds'])} "
+                  f"({summary['rows_per_sec'] or 0:,.0f} rows/s{memory})", file=self.stream)
+            for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1]):
+                print(f"[{self.name}]   {name:<12} {seconds:10.2f}s", file=self.stream)
+        
+        if self.trace_path:
+            trace = dict(summary, name=self.name, total=self.total,
+                         stages={name: round(seconds, 4) for name, seconds in self.stages.items()},
+                         samples=self.samples)
+            with open(self.trace_path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, indent=2)
+
+def active() -> Optional[Tracker]:
+    return _active
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block against the active tracker, if any"""
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name):
+            yield
+
+def advance(rows: int) -> None:
+    """Count rows against the active tracker, if any"""
+    if _active is not None:
+        _active.advance(rows)
+
+@contextmanager
+def profiled(path: Optional[str], stream: TextIO = sys.stderr, top: int = 15) -> Iterator[None]:
+    """Run the block under cProfile when path is set, dump the stats there and print the top entries"""
+    if not path:
+        yield
+        return
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}", file=stream)
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the shared --progress-interval, --trace and --profile options"""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--progress-interval", type=float, default=2.0,
+                       help="seconds between progress lines on stderr (default 2)")
+    group.add_argument("--quiet", action="store_true", help="do not print progress to stderr")
+    group.add_argument("--trace", metavar="FILE", help="write a JSON trace of rates, memory and stage times")
+    group.add_argument("--profile", metavar="FILE", help="run under cProfile and dump the stats to FILE")
+
+def tracker_from_args(args: argparse.Namespace, name: str, total: Optional[int] = None) -> Tracker:
+    return Tracker(name, total, interval=args.progress_interval, trace_path=args.trace, quiet=args.quiet)
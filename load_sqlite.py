@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Bulk load events and users into a local SQLite database.
+
+Events are read with the streaming reader from insert_events_from_json.py
+(JSON array or JSONL), users from users.csv. Rows are inserted with
+executemany inside large transactions, and secondary indexes are created only
+after the data is loaded. --benchmark compares batch sizes and transaction
+boundaries on a sample of the input so the fastest settings can be picked.
+"""
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import compression
+from insert_events_from_json import iter_batches, iter_events
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events_archive (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    type TEXT NOT NULL,
+    datetime_start TEXT NOT NULL,
+    provider TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    password_plain TEXT,
+    first_name TEXT NOT NULL,
+    surname TEXT NOT NULL,
+    birthday TEXT,
+    registered_at TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    last_logged_in TEXT NOT NULL
+);
+"""
+
+# Created after the load, which is much faster than maintaining them per row
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_archive_datetime_start ON events_archive (datetime_start);
+CREATE INDEX IF NOT EXISTS idx_events_archive_type ON events_archive (type);
+CREATE INDEX IF NOT EXISTS idx_events_archive_provider ON events_archive (provider);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+"""
+
+# Durability is traded for speed: a failed load is simply rerun
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+]
+
+INSERT_EVENT = "INSERT INTO events_archive (id, title, description, type, datetime_start, provider) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_USER = ("INSERT INTO users (user_id, email, password_hash, password_plain, first_name, surname, birthday, "
+               "registered_at, is_active, last_logged_in) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+def event_rows(events: Iterable[Dict]) -> Iterator[Tuple]:
+    """Convert event dicts to insert parameter tuples"""
+    for event in events:
+        yield (event['id'], event['title'], event['description'], event['type'], event['datetime_start'], event['provider'])
+
+def user_rows(users_csv: str) -> Iterator[Tuple]:
+    """Read users.csv as insert parameter tuples"""
+    with compression.open_input(users_csv, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for user_id, email, password_hash, password_plain, first_name, surname, birthday, registered_at, is_active, last_logged_in in reader:
+            yield (int(user_id), email, password_hash, password_plain, first_name, surname, birthday or None,
+                   registered_at, 1 if is_active == 'True' else 0, last_logged_in)
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a database configured for bulk loading, with transactions managed explicitly"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+    conn.executescript(SCHEMA)
+    return conn
+
+def load_rows(conn: sqlite3.Connection, insert_sql: str, rows: Iterable[Tuple],
+              batch_size: int, commit_every: int) -> int:
+    """Insert rows with executemany, committing every commit_every rows (0 = one transaction)"""
+    loaded = 0
+    since_commit = 0
+    conn.execute("BEGIN")
+    for batch in iter_batches(rows, batch_size):
+        conn.executemany(insert_sql, batch)
+        loaded += len(batch)
+        since_commit += len(batch)
+        if commit_every and since_commit >= commit_every:
+            conn.execute("COMMIT")
+            conn.execute("BEGIN")
+            since_commit = 0
+    conn.execute("COMMIT")
+    return loaded
+
+def timed_load(conn: sqlite3.Connection, label: str, insert_sql: str, rows: Iterable[Tuple],
+               batch_size: int, commit_every: int) -> Dict:
+    start = time.perf_counter()
+    loaded = load_rows(conn, insert_sql, rows, batch_size, commit_every)
+    elapsed = time.perf_counter() - start
+    rate = loaded / elapsed if elapsed else 0.0
+    print(f"{label}: {loaded:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)", file=sys.stderr)
+    return {"rows": loaded, "seconds": elapsed, "rows_per_sec": rate}
+
+def create_indexes(conn: sqlite3.Connection) -> float:
+    start = time.perf_counter()
+    conn.executescript(INDEXES)
+    elapsed = time.perf_counter() - start
+    print(f"indexes: created in {elapsed:.2f}s", file=sys.stderr)
+    return elapsed
+
+def load(db_path: str, events_file: Optional[str], users_csv: Optional[str],
+         batch_size: int, commit_every: int) -> None:
+    conn = connect(db_path)
+    try:
+        if events_file:
+            timed_load(conn, "events_archive", INSERT_EVENT, event_rows(iter_events(events_file)), batch_size, commit_every)
+        if users_csv:
+            timed_load(conn, "users", INSERT_USER, user_rows(users_csv), batch_size, commit_every)
+        create_indexes(conn)
+    finally:
+        conn.close()
+
+def benchmark(events_file: Optional[str], users_csv: Optional[str], batch_sizes: Sequence[int],
+              commit_intervals: Sequence[int], limit: int, work_dir: Optional[str]) -> List[Dict]:
+    """Load the same in-memory sample into a fresh database for every setting"""
+    samples = []
+    if events_file:
+        samples.append(("events_archive", INSERT_EVENT, list(itertools.islice(event_rows(iter_events(events_file)), limit))))
+    if users_csv:
+        samples.append(("users", INSERT_USER, list(itertools.islice(user_rows(users_csv), limit))))
+    
+    results = []
+    for batch_size, commit_every in itertools.product(batch_sizes, commit_intervals):
+        with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+            conn = connect(os.path.join(tmp, "bench.db"))
+            try:
+                for table, insert_sql, rows in samples:
+                    label = f"{table} batch={batch_size} commit_every={commit_every or 'end'}"
+                    result = timed_load(conn, label, insert_sql, rows, batch_size, commit_every)
+                    result.update(table=table, batch_size=batch_size, commit_every=commit_every)
+                    results.append(result)
+            finally:
+                conn.close()
+    
+    print("\ntable            batch_size  commit_every      rows/sec")
+    for result in sorted(results, key=lambda r: (r["table"], -r["rows_per_sec"])):
+        print(f"{result['table']:<16} {result['batch_size']:>10,}  {result['commit_every'] or 'end':>12}  {result['rows_per_sec']:>12,.0f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load events and users into SQLite")
+    parser.add_argument("--db", default="tickets.db", help="SQLite database file")
+    parser.add_argument("--events", help="events JSON or JSONL file, e.g. events_archive.json")
+    parser.add_argument("--users", help="users CSV file, e.g. users.csv")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[10000], help="rows per executemany call")
+    parser.add_argument("--commit-every", type=int, nargs="+", default=[0],
+                        help="rows per transaction, 0 for a single transaction")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare every batch size / commit interval combination on a sample")
+    parser.add_argument("--limit", type=int, default=200_000, help="rows per table sampled for --benchmark")
+    args = parser.parse_args()
+    
+    if not args.events and not args.users:
+        parser.error("nothing to load: pass --events and/or --users")
+    if not args.benchmark:
+        for option, values in (("--batch-size", args.batch_size), ("--commit-every", args.commit_every)):
+            if len(values) > 1:
+                parser.error(f"{option} takes several values only with --benchmark")
+    
+    if args.benchmark:
+        benchmark(args.events, args.users, args.batch_size, args.commit_every, args.limit, os.path.dirname(os.path.abspath(args.db)))
+    else:
+        load(args.db, args.events, args.users, args.batch_size[0], args.commit_every[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Batched password generation and pluggable, parallel password hashing.
+
+Plain passwords are drawn for a whole batch at once from a NumPy generator.
+Hashing is done by a hasher object (SHA-256 hex digests by default, or
+PBKDF2, scrypt and bcrypt in the formats common auth stacks store). A
+PasswordStage runs the hasher on chunks in a process pool and returns a
+handle right away, so the caller can generate the next batch while the
+current one is being hashed.
+
+Salts are drawn from a generator seeded with (seed, first user id of the
+batch), so hashes are reproducible and do not depend on the worker count.
+"""
+import base64
+import hashlib
+import os
+import string
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Characters used in plain passwords
+PASSWORD_CHARS = string.ascii_letters + string.digits + string.punctuation
+PASSWORD_MIN_LENGTH = 8
+PASSWORD_MAX_LENGTH = 16
+
+PASSWORD_CHARS_TABLE = np.frombuffer(PASSWORD_CHARS.encode('ascii'), dtype=np.uint8)
+
+# Passwords hashed per process pool task
+HASH_CHUNK_SIZE = 5000
+
+def generate_passwords(rng, count) -> List[str]:
+    """Draw count random passwords of 8-16 characters in bulk"""
+    lengths = rng.integers(PASSWORD_MIN_LENGTH, PASSWORD_MAX_LENGTH + 1, count).tolist()
+    char_indices = rng.integers(0, len(PASSWORD_CHARS_TABLE), (count, PASSWORD_MAX_LENGTH))
+    raw = PASSWORD_CHARS_TABLE[char_indices].tobytes().decode('ascii')
+    return [raw[i * PASSWORD_MAX_LENGTH:i * PASSWORD_MAX_LENGTH + length] for i, length in enumerate(lengths)]
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+class Sha256Hasher:
+    """Unsalted SHA-256 hex digest, the original users.csv format"""
+    name = 'sha256'
+    salt_size = 0
+    max_length = 64
+
+    def hash(self, password: bytes, salt: bytes) -> str:
+        return hashlib.sha256(password).hexdigest()
+
+class Pbkdf2Hasher:
+    """PBKDF2-HMAC-SHA256 in Django's pbkdf2_sha256$iterations$salt$hash format"""
+    name = 'pbkdf2'
+    salt_size = 16
+    max_length = 128
+
+    def __init__(self, iterations: int = 600_000):
+        if iterations < 1:
+            raise ValueError(f"pbkdf2 iterations must be positive, got {iterations}")
+        self.iterations = iterations
+
+    def hash(self, password: bytes, salt: bytes) -> str:
+        digest = hashlib.pbkdf2_hmac('sha256', password, salt, self.iterations)
+        return f"pbkdf2_sha256${self.iterations}${_b64(salt)}${_b64(digest)}"
+
+class ScryptHasher:
+    """scrypt in scrypt$n$r$p$salt$hash format"""
+    name = 'scrypt'
+    salt_size = 16
+    max_length = 128
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        if n < 2 or n & (n - 1):
+            raise ValueError(f"scrypt n must be a power of two greater than 1, got {n}")
+        if r < 1 or p < 1:
+            raise ValueError(f"scrypt r and p must be positive, got r={r}, p={p}")
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def hash(self, password: bytes, salt: bytes) -> str:
+        digest = hashlib.scrypt(password, salt=salt, n=self.n, r=self.r, p=self.p, maxmem=256 * self.n * self.r + (1 << 20))
+        return f"scrypt${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}"
+
+_BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+_STANDARD_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_TO_BCRYPT_BASE64 = str.maketrans(_STANDARD_ALPHABET, _BCRYPT_ALPHABET)
+
+class BcryptHasher:
+    """bcrypt $2b$ hashes; needs the optional bcrypt package (python3 -m pip install bcrypt)"""
+    name = 'bcrypt'
+    salt_size = 16
+    max_length = 60
+
+    def __init__(self, rounds: int = 12):
+        if not 4 <= rounds <= 31:
+            raise ValueError(f"bcrypt rounds must be between 4 and 31, got {rounds}")
+        try:
+            import bcrypt  # noqa: F401
+        except ImportError:
+            raise RuntimeError("bcrypt hashing requires the bcrypt package: python3 -m pip install bcrypt") from None
+        self.rounds = rounds
+
+    def hash(self, password: bytes, salt: bytes) -> str:
+        import bcrypt
+        # bcrypt salts are 22 characters of its own base64 alphabet
+        encoded_salt = _b64(salt).translate(_TO_BCRYPT_BASE64)[:22]
+        return bcrypt.hashpw(password, f"$2b${self.rounds:02d}${encoded_salt}".encode('ascii')).decode('ascii')
+
+HASHERS = {
+    'sha256': Sha256Hasher,
+    'pbkdf2': Pbkdf2Hasher,
+    'scrypt': ScryptHasher,
+    'bcrypt': BcryptHasher,
+}
+
+def make_hasher(spec: str):
+    """Build a hasher from 'name' or 'name:cost', e.g. 'pbkdf2:100000' or 'bcrypt:10'"""
+    name, _, cost = spec.partition(':')
+    if name not in HASHERS:
+        raise ValueError(f"Unknown password hash {name!r}, expected one of {', '.join(HASHERS)}")
+    if not cost:
+        return HASHERS[name]()
+    if name == 'sha256':
+        raise ValueError("sha256 has no cost parameter")
+    if not cost.isdigit() or int(cost) < 1:
+        raise ValueError(f"Invalid cost {cost!r} in password hash {spec!r}, expected a positive integer")
+    return HASHERS[name](int(cost))
+
+def hash_chunk(hasher, passwords: Sequence[str], salts: bytes) -> List[str]:
+    """Hash a chunk of passwords, salts holds hasher.salt_size bytes per password"""
+    size = hasher.salt_size
+    return [hasher.hash(password.encode('ascii'), salts[i * size:(i + 1) * size])
+            for i, password in enumerate(passwords)]
+
+class PendingHashes:
+    """Handle for the hashes of one batch, possibly still being computed"""
+
+    def __init__(self, futures: List[Future]):
+        self.futures = futures
+
+    def result(self) -> List[str]:
+        hashes = []
+        for future in self.futures:
+            hashes.extend(future.result())
+        return hashes
+
+class PasswordStage:
+    """Hash password batches inline (workers=0) or across a process pool"""
+
+    def __init__(self, hasher=None, workers: int = 0, seed: int = 0, chunk_size: int = HASH_CHUNK_SIZE):
+        self.hasher = hasher or Sha256Hasher()
+        self.workers = workers
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "PasswordStage":
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def salts(self, start_id: int, count: int) -> bytes:
+        if not self.hasher.salt_size:
+            return b''
+        return np.random.default_rng([self.seed, start_id]).bytes(self.hasher.salt_size * count)
+
+    def submit(self, passwords: Sequence[str], start_id: int) -> PendingHashes:
+        """Start hashing the passwords of the batch beginning at start_id"""
+        salts = self.salts(start_id, len(passwords))
+        size = self.hasher.salt_size
+        futures = []
+        for start in range(0, len(passwords), self.chunk_size):
+            chunk = passwords[start:start + self.chunk_size]
+            chunk_salts = salts[start * size:(start + len(chunk)) * size]
+            if self.executor is None:
+                future = Future()
+                future.set_result(hash_chunk(self.hasher, chunk, chunk_salts))
+            else:
+                future = self.executor.submit(hash_chunk, self.hasher, chunk, chunk_salts)
+            futures.append(future)
+        return PendingHashes(futures)
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
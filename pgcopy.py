@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Writers for PostgreSQL COPY FROM STDIN data in text and binary (PGCOPY) format.
+
+Text format rows are tab-separated with backslash escapes and \\N for NULL.
+Binary format follows https://www.postgresql.org/docs/current/sql-copy.html:
+a fixed header, one tuple per row (field count, then length-prefixed fields)
+and a -1 trailer. Binary fields must match the column types exactly, so
+writers are created with the list of PostgreSQL types of the target columns.
+"""
+import struct
+from datetime import date, datetime
+from typing import BinaryIO, Callable, Dict, List, Sequence
+
+import numpy as np
+
+NULL = "\\N"
+
+# Marks the end of inline COPY data in a psql script
+END_OF_DATA = "\\.\n"
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+# PostgreSQL dates and timestamps count from 2000-01-01
+PG_EPOCH_DATE = date(2000, 1, 1)
+PG_EPOCH = datetime(2000, 1, 1)
+
+_FIELD_LENGTH = struct.Struct(">i")
+_INT2 = struct.Struct(">h")
+_INT4_FIELD = struct.Struct(">ii")
+_INT8_FIELD = struct.Struct(">iq")
+_BOOL_FIELD = struct.Struct(">i?")
+_NULL_FIELD = _FIELD_LENGTH.pack(-1)
+
+# Signature, flags field and header extension length, and the end-of-data marker
+BINARY_HEADER = BINARY_SIGNATURE + _FIELD_LENGTH.pack(0) + _FIELD_LENGTH.pack(0)
+BINARY_TRAILER = _INT2.pack(-1)
+
+def escape_copy_text(value: str) -> str:
+    """Escape backslashes, tabs and line breaks for COPY text format"""
+    return value.translate(_TEXT_ESCAPES)
+
+def format_copy_value(value) -> str:
+    """Format one value for COPY text format"""
+    if value is None:
+        return NULL
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, str):
+        return escape_copy_text(value)
+    return str(value)
+
+def format_copy_row(values: Sequence) -> str:
+    """Format one row as a COPY text line"""
+    return "\t".join([format_copy_value(value) for value in values]) + "\n"
+
+def copy_statement(table: str, columns: Sequence[str], binary: bool = False) -> str:
+    """Build the COPY ... FROM STDIN statement for a table"""
+    options = " WITH (FORMAT binary)" if binary else ""
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN{options};\n"
+
+def _encode_int4(value) -> bytes:
+    return _INT4_FIELD.pack(4, value)
+
+def _encode_int8(value) -> bytes:
+    return _INT8_FIELD.pack(8, value)
+
+def _encode_bool(value) -> bytes:
+    return _BOOL_FIELD.pack(1, value)
+
+def _encode_text(value) -> bytes:
+    data = value.encode("utf-8")
+    return _FIELD_LENGTH.pack(len(data)) + data
+
+def _encode_date(value) -> bytes:
+    # Accepts a date, an ISO 'YYYY-MM-DD' string or days since 2000-01-01
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if isinstance(value, date):
+        value = (value - PG_EPOCH_DATE).days
+    return _INT4_FIELD.pack(4, value)
+
+def _encode_timestamp(value) -> bytes:
+    # Accepts a datetime, an ISO string or microseconds since 2000-01-01
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        delta = value - PG_EPOCH
+        value = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return _INT8_FIELD.pack(8, value)
+
+BINARY_ENCODERS: Dict[str, Callable[[object], bytes]] = {
+    "int4": _encode_int4,
+    "int8": _encode_int8,
+    "bool": _encode_bool,
+    "text": _encode_text,
+    "date": _encode_date,
+    "timestamp": _encode_timestamp,
+}
+
+def encode_int4_prefixes(columns: Sequence[np.ndarray], field_count: int) -> List[bytes]:
+    """Binary tuples for whole integer columns at once: the field count and one
+    int4 field per column, as one bytes object per row. The remaining
+    field_count - len(columns) fields are appended by the caller.
+    """
+    layout = [("count", ">i2")]
+    for i in range(len(columns)):
+        layout += [(f"length{i}", ">i4"), (f"value{i}", ">i4")]
+    records = np.empty(len(columns[0]) if columns else 0, dtype=layout)
+    records["count"] = field_count
+    for i, values in enumerate(columns):
+        records[f"length{i}"] = 4
+        records[f"value{i}"] = values
+    # A void view keeps trailing zero bytes, unlike a bytes (S) view
+    return records.view(f"V{records.dtype.itemsize}").tolist()
+
+class BinaryCopyWriter:
+    """Write rows in PGCOPY binary format to a binary stream"""
+
+    def __init__(self, stream: BinaryIO, column_types: Sequence[str], header: bool = True):
+        unknown = [column_type for column_type in column_types if column_type not in BINARY_ENCODERS]
+        if unknown:
+            raise ValueError(f"Unsupported column types: {', '.join(unknown)}")
+        
+        self.stream = stream
+        self.encoders: List[Callable[[object], bytes]] = [BINARY_ENCODERS[t] for t in column_types]
+        self.tuple_header = _INT2.pack(len(column_types))
+        self.rows = 0
+        
+        # Signature, flags field and header extension length; skipped when
+        # appending rows to a stream that already has them
+        if header:
+            stream.write(BINARY_HEADER)
+
+    def write_row(self, values: Sequence) -> None:
+        fields = [self.tuple_header]
+        for encode, value in zip(self.encoders, values):
+            fields.append(_NULL_FIELD if value is None else encode(value))
+        self.stream.write(b"".join(fields))
+        self.rows += 1
+
+    def write_rows(self, rows) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def close(self) -> None:
+        self.stream.write(BINARY_TRAILER)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Named scale profiles and a dry-run estimator shared by the generator scripts.
+
+A profile sets the row counts, seeds, date windows and ID offsets of every
+generator, so a smoke-test or stress dataset needs no source edits:
+
+    python3 generate_events.py --scale tiny
+    python3 events_archive.py --scale ci
+    python3 generate_ticket_users.py --scale stress --dry-run
+    python3 generate_requests.py --scale ci --events events.json
+
+Settings are resolved per generator section ("events", "archive", "users",
+"persons", "requests", "inventory") in this order, later ones winning: the
+script's own defaults, the profile, a JSON --config file and finally options
+given on the command line.
+Without --scale or --config the scripts behave exactly as before. A config
+file may name its base profile and override any section; top-level keys
+apply to every section that has them:
+
+    {"scale": "ci", "now": "2025-09-01", "archive": {"count": 250000, "start_year": 2020}}
+
+--dry-run generates a small sample into a temporary directory and
+extrapolates rows, output bytes, wall time and peak memory for the full run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+import instrumentation
+
+# Generator sections of a profile
+SECTIONS = ("events", "archive", "users", "persons", "requests", "inventory")
+
+NOW = "2025-08-15"
+
+PROFILES: Dict[str, Dict] = {
+    # Seconds to generate, for trying things out
+    "tiny": {
+        "events": {"count": 100, "seed": 42, "id_start": 1, "now": NOW},
+        "archive": {"count": 10_000, "seed": 42, "id_start": 100_000, "start_year": 2024, "end_year": 2024},
+        "users": {"count": 1_000, "seed": 42, "id_start": 1, "now": NOW},
+        "persons": {"count": 1_000, "seed": 42},
+        "requests": {"seed": 42, "rate": 10.0, "duration": 60.0},
+        "inventory": {"seed": 42, "occupancy": 0.6, "reserved_share": 0.02},
+    },
+    # Small enough for every CI run, large enough to cover every batch and shard path
+    "ci": {
+        "events": {"count": 1_000, "seed": 42, "id_start": 1, "now": NOW},
+        "archive": {"count": 300_000, "seed": 42, "id_start": 100_000, "start_year": 2022, "end_year": 2024},
+        "users": {"count": 20_000, "seed": 42, "id_start": 1, "now": NOW},
+        "persons": {"count": 20_000, "seed": 42},
+        "requests": {"seed": 42, "rate": 50.0, "duration": 300.0},
+        "inventory": {"seed": 42, "occupancy": 0.6, "reserved_share": 0.02},
+    },
+    # The HackLoad dataset: the scripts' built-in sizes with fixed seeds
+    "prod": {
+        "events": {"count": 10_000, "seed": 42, "id_start": 1, "now": NOW},
+        "archive": {"count": 6_000_000, "seed": 42, "id_start": 100_000, "start_year": 2015, "end_year": 2024},
+        "users": {"count": 1_000_000, "seed": 42, "id_start": 1, "now": NOW},
+        "persons": {"count": 1_000_000, "seed": 42},
+        "requests": {"seed": 42, "rate": 100.0, "duration": 3600.0},
+        "inventory": {"seed": 42, "occupancy": 0.6, "reserved_share": 0.02},
+    },
+    # 10x prod; the archive moves up so 100k upcoming events still fit below it
+    "stress": {
+        "events": {"count": 100_000, "seed": 42, "id_start": 1, "now": NOW},
+        "archive": {"count": 60_000_000, "seed": 42, "id_start": 1_000_000, "start_year": 2015, "end_year": 2024},
+        "users": {"count": 10_000_000, "seed": 42, "id_start": 1, "now": NOW},
+        "persons": {"count": 10_000_000, "seed": 42},
+        "requests": {"seed": 42, "rate": 1000.0, "duration": 3600.0, "curve": "spike", "peak": 5.0},
+        "inventory": {"seed": 42, "occupancy": 0.6, "reserved_share": 0.02},
+    },
+}
+
+# Rows generated by --dry-run when no number is given, unless the script sets its own
+SAMPLE_ROWS = 20_000
+
+def add_arguments(parser: argparse.ArgumentParser, dry_run: bool = True, sample_rows: int = SAMPLE_ROWS,
+                  unit: str = "rows") -> None:
+    """Add the shared --scale, --config and --dry-run options (--profile is taken by instrumentation)
+
+    sample_rows is the --dry-run sample size when no number is given, in the
+    script's unit of work (rows, sessions, events).
+    """
+    group = parser.add_argument_group("scale")
+    group.add_argument("--scale", choices=list(PROFILES), default=None,
+                       help="named scale profile for counts, seeds, date windows and ID offsets")
+    group.add_argument("--config", metavar="FILE", default=None,
+                       help="JSON file overriding profile settings (may name its base profile)")
+    if dry_run:
+        group.add_argument("--dry-run", type=int, nargs="?", const=sample_rows, default=None, metavar="N",
+                           help=f"generate a sample of N {unit} (default {sample_rows:,}) and estimate the full run "
+                                "instead of running it")
+
+def load_config(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    unknown = [key for key, value in config.items() if isinstance(value, dict) and key not in SECTIONS]
+    if unknown:
+        raise ValueError(f"{path}: unknown sections {', '.join(unknown)}, expected {', '.join(SECTIONS)}")
+    return config
+
+def settings(section: str, profile: Optional[str] = None, config: Optional[Dict] = None) -> Dict:
+    """Settings of one generator section from a profile and a loaded config (either may be None)"""
+    config = config or {}
+    profile = profile or config.get("scale")
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}, expected one of {', '.join(PROFILES)}")
+    resolved = dict(PROFILES[profile][section]) if profile else {}
+    resolved.update({key: value for key, value in config.items() if key != "scale" and not isinstance(value, dict)})
+    resolved.update(config.get(section, {}))
+    return resolved
+
+def apply(args: argparse.Namespace, section: str, defaults: Dict) -> Dict:
+    """Fill options left at None in args from the profile/config, then from defaults
+
+    Only the keys of defaults are considered, so each script picks the
+    settings it understands. Returns the resolved values.
+    """
+    config = load_config(args.config) if args.config else None
+    chosen = settings(section, args.scale, config)
+    resolved = {}
+    for key, default in defaults.items():
+        value = getattr(args, key, None)
+        if value is None:
+            value = chosen.get(key, default)
+            setattr(args, key, value)
+        resolved[key] = value
+    return resolved
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def _directory_size(path: str) -> int:
+    # Checkpoint files are bookkeeping, not output
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names if not name.endswith(".checkpoint"))
+
+def _measure(run_sample: Callable[[int, str], None], rows: int, traced: bool) -> Dict:
+    # One sample run in a scratch directory; tracemalloc slows it down, so time is taken untraced
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        if traced:
+            tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            run_sample(rows, directory)
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if traced else 0
+        finally:
+            if traced:
+                tracemalloc.stop()
+        return {"seconds": seconds, "bytes": _directory_size(directory), "memory": peak}
+
+def dry_run(name: str, total_rows: int, run_sample: Callable[[int, str], None], resident_rows: Optional[int] = None,
+            workers: int = 1, sample_rows: int = SAMPLE_ROWS, unit: str = "rows", stream=sys.stdout) -> Dict:
+    """Run run_sample(rows, directory) on small samples and extrapolate to total_rows
+
+    run_sample writes its outputs into the given temporary directory, on one
+    process. Samples of half and all of sample_rows separate fixed costs
+    (startup, headers, lookup tables) from per-row costs, and each quantity is
+    extrapolated along that line: time to total_rows divided by workers for
+    parallel generators, bytes to total_rows, and memory to resident_rows,
+    the number of rows the full run holds at once (a shard or batch for
+    streaming generators, all of them otherwise), on top of what the process
+    already uses. Rows are whatever unit the script counts its work in.
+    """
+    rows = max(2, min(total_rows, sample_rows))
+    half = rows // 2
+    resident = min(total_rows, resident_rows or total_rows)
+    baseline = instrumentation.peak_rss_bytes() or 0
+    timed = [_measure(run_sample, count, traced=False) for count in (half, rows)]
+    traced = [_measure(run_sample, count, traced=True)["memory"] for count in (half, rows)]
+
+    def extrapolate(small: float, large: float, target: float) -> float:
+        # Value at target rows on the line through the half and full samples
+        per_row = max(large - small, 0) / (rows - half)
+        fixed = large - per_row * rows
+        if fixed < 0:
+            # Noise between the samples; scale the full sample proportionally instead
+            fixed, per_row = 0, large / rows
+        return fixed + per_row * target
+
+    estimate = {
+        "generator": name,
+        "sample_rows": rows,
+        "sample_seconds": timed[1]["seconds"],
+        "sample_bytes": timed[1]["bytes"],
+        "rows": total_rows,
+        "bytes": extrapolate(timed[0]["bytes"], timed[1]["bytes"], total_rows),
+        "seconds": extrapolate(timed[0]["seconds"], timed[1]["seconds"], total_rows / max(workers, 1)),
+        "peak_memory": baseline + extrapolate(traced[0], traced[1], max(resident, rows)),
+    }
+    parallel = f" on {workers} workers" if workers > 1 else ""
+    print(f"Dry run for {name}: {rows:,} sample {unit} in {estimate['sample_seconds']:.2f}s, "
+          f"{format_bytes(estimate['sample_bytes'])}", file=stream)
+    print(f"Estimated for {total_rows:,} {unit}: output {format_bytes(estimate['bytes'])}, "
+          f"wall time {format_duration(estimate['seconds'])}{parallel}, "
+          f"peak memory {format_bytes(estimate['peak_memory'])}", file=stream)
+    return estimate
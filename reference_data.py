@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Reference CSVs (names, cities, streets, banks) with a binary cache.
+
+Each CSV is parsed once with the csv module and saved as an .npz file of
+fixed-width unicode columns under .cache/. Later runs load the .npz
+instead, without pandas. The cache is keyed on the source file's size and
+mtime; if those change but the content hash does not (e.g. after a fresh
+checkout), the cached arrays are kept and only the key is refreshed.
+
+    first = reference_data.by_sex(reference_data.table("first_names"))
+    first["F"]["NameEn"]          # object array of female English names
+
+Tables are returned as dicts of object arrays, in file order.
+"""
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, ".cache", "reference")
+
+# Bump when the cached layout changes
+CACHE_VERSION = 1
+
+# Reference files shipped with the repository
+TABLES = ("first_names", "last_names", "cities", "streets", "banks")
+
+_META_KEY = "__meta__"
+
+_loaded: Dict[str, Dict[str, np.ndarray]] = {}
+
+def _source_key(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def parse_csv(path: str) -> Dict[str, np.ndarray]:
+    """Columns of a CSV file with a header row as unicode arrays"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [row for row in reader if row]
+    return {name: np.array([row[i] for row in rows], dtype=str) for i, name in enumerate(header)}
+
+def _read_cache(cache_path: str) -> Optional[tuple]:
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            meta = json.loads(str(cached[_META_KEY]))
+            columns = {name: cached[name] for name in meta["columns"]}
+        return meta, columns
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_cache(cache_path: str, meta: Dict, columns: Dict[str, np.ndarray]) -> None:
+    # The cache is an optimization: a read-only checkout just parses every time
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temporary = cache_path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, **{_META_KEY: np.array(json.dumps(meta))}, **columns)
+        os.replace(temporary, cache_path)
+    except OSError:
+        pass
+
+def load_columns(path: str, cache_dir: str = CACHE_DIR) -> Dict[str, np.ndarray]:
+    """Columns of path, from the binary cache when it is still valid"""
+    key = _source_key(path)
+    cache_path = os.path.join(cache_dir, os.path.basename(path) + ".npz")
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        meta, columns = cached
+        if meta["key"] == key:
+            return columns
+        digest = _file_hash(path)
+        if meta["sha256"] == digest and meta["key"]["version"] == CACHE_VERSION:
+            _write_cache(cache_path, dict(meta, key=key), columns)
+            return columns
+    else:
+        digest = _file_hash(path)
+
+    columns = parse_csv(path)
+    _write_cache(cache_path, {"key": key, "sha256": digest, "columns": list(columns)}, columns)
+    return columns
+
+def table(name: str, data_dir: str = DATA_DIR) -> Dict[str, np.ndarray]:
+    """One of TABLES (or any <name>.csv in data_dir) as a dict of object arrays, cached per process"""
+    path = os.path.join(data_dir, f"{name}.csv")
+    if path not in _loaded:
+        _loaded[path] = {column: values.astype(object) for column, values in load_columns(path).items()}
+    return _loaded[path]
+
+def by_sex(columns: Dict[str, np.ndarray]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Split a table with a Sex column into {"M": columns, "F": columns}, keeping file order"""
+    sex = columns["Sex"]
+    return {value: {name: values[sex == value] for name, values in columns.items() if name != "Sex"}
+            for value in ("M", "F")}
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Replay a requests.jsonl stream against an HTTP server and report latencies.
+
+Requests are sent open-loop: each one is due at a fixed time, either
+index / --rps or its recorded "t" offset (scaled by --speed), whether or not
+earlier requests have completed. Latency is measured from the due time, so a
+server that falls behind shows up in the percentiles instead of silently
+slowing the load down. --max-in-flight bounds the number of outstanding
+requests, and requests share a pool of HTTP/1.1 keep-alive connections.
+
+Latencies go into per-endpoint log-linear histograms (HDR style, about 1%
+precision) that report p50/p99/p999 alongside error rates. --stub starts a
+local stub server in-process so the replayer can be tried without a backend:
+
+    python3 replay_requests.py requests.jsonl --stub --rps 2000
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import compression
+import instrumentation
+
+# Histogram precision: values keep this many significant bits
+SIGNIFICANT_BITS = 7
+
+class Histogram:
+    """Log-linear histogram of integer values (microseconds)
+
+    Values below 2**SIGNIFICANT_BITS have their own bucket; above that each
+    power of two is split into 2**(SIGNIFICANT_BITS - 1) equal buckets.
+    """
+
+    def __init__(self):
+        self.counts: List[int] = []
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        shift = value.bit_length() - SIGNIFICANT_BITS
+        if shift <= 0:
+            return value
+        return (shift << (SIGNIFICANT_BITS - 1)) + (value >> shift)
+
+    @staticmethod
+    def highest_value(index: int) -> int:
+        """Largest value that falls into a bucket"""
+        if index < 1 << SIGNIFICANT_BITS:
+            return index
+        shift = (index >> (SIGNIFICANT_BITS - 1)) - 1
+        mantissa = index - (shift << (SIGNIFICANT_BITS - 1))
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        index = self.index(max(value, 0))
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        if not self.total:
+            return 0
+        rank = max(1, round(self.total * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.highest_value(index), self.max)
+        return self.max
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, micros: int, status: str, error: bool) -> None:
+        self.latency.record(micros)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        latency = self.latency
+        return {
+            "requests": latency.total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / latency.total, 6) if latency.total else 0.0,
+            "p50_ms": latency.percentile(50) / 1000,
+            "p99_ms": latency.percentile(99) / 1000,
+            "p999_ms": latency.percentile(99.9) / 1000,
+            "max_ms": latency.max / 1000,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+def endpoint_of(request: Dict) -> str:
+    """Stats key: the request type if present, else method and path without the query"""
+    return request.get("type") or f"{request.get('method', 'GET')} {request['path'].split('?', 1)[0]}"
+
+def encode_request(request: Dict, host: str) -> bytes:
+    body = json.dumps(request["body"], ensure_ascii=False).encode("utf-8") if "body" in request else b""
+    lines = [f"{request.get('method', 'GET')} {request['path']} HTTP/1.1", f"Host: {host}"]
+    auth = request.get("auth")
+    if auth:
+        credentials = base64.b64encode(f"{auth['email']}:{auth['password']}".encode("utf-8")).decode("ascii")
+        lines.append(f"Authorization: Basic {credentials}")
+    if body:
+        lines.append("Content-Type: application/json")
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + body
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+    """Read one response; returns (status, keep_alive)"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ", 2)[:2]
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return int(status), False
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return int(status), keep_alive
+
+class ConnectionPool:
+    """Idle keep-alive connections to one host, opened on demand up to size"""
+
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def acquire(self):
+        await self.slots.acquire()
+        if self.idle:
+            return self.idle.pop()
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, connection, reusable: bool) -> None:
+        if reusable:
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+        self.slots.release()
+
+    def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+class Replayer:
+    def __init__(self, url: str, connections: int, max_in_flight: int, timeout: float):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError(f"only http:// targets are supported, got {url}")
+        self.host_header = parts.netloc
+        self.pool = ConnectionPool(parts.hostname, parts.port or 80, connections)
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.timeout = timeout
+        self.stats: Dict[str, EndpointStats] = {}
+
+    async def send(self, request: Dict, due: float) -> None:
+        status, error = "error", True
+        try:
+            connection = await self.pool.acquire()
+            reusable = False
+            try:
+                reader, writer = connection
+                writer.write(encode_request(request, self.host_header))
+                code, reusable = await asyncio.wait_for(read_response(reader), self.timeout)
+                status, error = str(code), code >= 400
+            finally:
+                self.pool.release(connection, reusable)
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status = "error"
+        finally:
+            self.in_flight.release()
+
+        micros = int((time.perf_counter() - due) * 1_000_000)
+        key = endpoint_of(request)
+        if key not in self.stats:
+            self.stats[key] = EndpointStats()
+        self.stats[key].record(micros, status, error)
+        instrumentation.advance(1)
+
+    async def run(self, requests: Iterator[Tuple[float, Dict]]) -> float:
+        """Send every (offset, request) at start + offset; returns the elapsed seconds"""
+        tasks = set()
+        start = time.perf_counter()
+        for offset, request in requests:
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+            await self.in_flight.acquire()
+            task = asyncio.ensure_future(self.send(request, due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.pool.close()
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict:
+        overall = EndpointStats()
+        for stats in self.stats.values():
+            overall.latency.merge(stats.latency)
+            overall.errors += stats.errors
+            for status, count in stats.statuses.items():
+                overall.statuses[status] = overall.statuses.get(status, 0) + count
+        summary = overall.summary()
+        return {
+            "seconds": round(elapsed, 3),
+            "requests_per_sec": round(summary["requests"] / elapsed, 1) if elapsed > 0 else None,
+            "overall": summary,
+            "endpoints": {key: self.stats[key].summary() for key in sorted(self.stats)},
+        }
+
+def iter_requests(path: str, rps: Optional[float], speed: float, limit: Optional[int]) -> Iterator[Tuple[float, Dict]]:
+    """(offset seconds, request) pairs, read lazily from a JSONL file"""
+    with compression.open_input(path) as f:
+        for index, line in enumerate(f):
+            if limit is not None and index >= limit:
+                break
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            yield (index / rps if rps else request.get("t", 0.0) / speed), request
+
+def print_report(report: Dict, stream=sys.stdout) -> None:
+    print(f"{report['overall']['requests']:,} requests in {report['seconds']:.1f}s "
+          f"({report['requests_per_sec'] or 0:,.0f} req/s)", file=stream)
+    print(f"{'endpoint':<12} {'requests':>10} {'errors':>8} {'p50 ms':>9} {'p99 ms':>9} {'p999 ms':>9} {'max ms':>9}", file=stream)
+    rows = list(report["endpoints"].items()) + [("all", report["overall"])]
+    for key, stats in rows:
+        print(f"{key:<12} {stats['requests']:>10,} {stats['error_rate']:>8.2%} {stats['p50_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['p999_ms']:>9.2f} {stats['max_ms']:>9.2f}", file=stream)
+
+class StubProtocol(asyncio.Protocol):
+    """Answers every request with 200 and a small JSON body, keeping the connection open"""
+    response = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 11\r\n\r\n{\"ok\":true}"
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b""
+
+    def data_received(self, data):
+        self.buffer += data
+        while True:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            length = 0
+            for line in self.buffer[:end].split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            if len(self.buffer) < end + 4 + length:
+                return
+            self.buffer = self.buffer[end + 4 + length:]
+            self.transport.write(self.response)
+
+async def start_stub(host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    return await asyncio.get_running_loop().create_server(StubProtocol, host, port)
+
+async def replay(args) -> Dict:
+    url = args.url
+    stub = None
+    if args.stub:
+        stub = await start_stub()
+        url = "http://127.0.0.1:%d" % stub.sockets[0].getsockname()[1]
+
+    replayer = Replayer(url, args.connections, args.max_in_flight, args.timeout)
+    try:
+        elapsed = await replayer.run(iter_requests(args.requests, args.rps, args.speed, args.limit))
+    finally:
+        if stub is not None:
+            stub.close()
+    return replayer.report(elapsed)
+
+async def serve_stub(port: int) -> None:
+    server = await start_stub("0.0.0.0", port)
+    print(f"Stub server listening on port {port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay requests.jsonl against an HTTP server")
+    parser.add_argument("requests", nargs="?", default="requests.jsonl", help="request stream from generate_requests.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="base URL of the server under test")
+    parser.add_argument("--stub", action="store_true", help="replay against a local in-process stub server")
+    parser.add_argument("--serve-stub", type=int, metavar="PORT", help="only run the stub server on PORT")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="send at this fixed rate instead of the recorded timestamps")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression of recorded timestamps")
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive connection pool size")
+    parser.add_argument("--max-in-flight", type=int, default=1024, help="maximum outstanding requests")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for a response")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--report", metavar="FILE", help="also write the report as JSON")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve_stub is not None:
+        asyncio.run(serve_stub(args.serve_stub))
+        return
+
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "replay", args.limit):
+        report = asyncio.run(replay(args))
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
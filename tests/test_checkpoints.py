@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import checkpoints
+import events_archive
+import generate_ticket_users
+from events_archive import EventsArchiveGenerator, write_archive
+
+class Interrupted(Exception):
+    pass
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def generate_archive(path, fmt, **options):
+    return write_archive(EventsArchiveGenerator(), path, fmt, 5000, 2023, 2024, 11, 1, **options)
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(events_archive, "SHARD_SIZE", 1000)
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "normalized"])
+def test_archive_resume_is_byte_identical(tmp_path, monkeypatch, small_shards, fmt):
+    expected = str(tmp_path / f"expected.{fmt}")
+    generate_archive(expected, fmt)
+    assert not os.path.exists(checkpoints.path_for(expected))
+
+    output_class = type(events_archive.open_events_output(str(tmp_path / "probe"), fmt, None, None,
+                                                          EventsArchiveGenerator().dictionaries))
+    write = output_class.write
+    calls = []
+
+    def failing_write(self, events):
+        calls.append(1)
+        if len(calls) == 3:
+            # Part of a shard reaches the file before the crash
+            self.file.write(b"partial")
+            raise Interrupted()
+        write(self, events)
+
+    path = str(tmp_path / f"archive.{fmt}")
+    monkeypatch.setattr(output_class, "write", failing_write)
+    with pytest.raises(Interrupted):
+        generate_archive(path, fmt, checkpoint_path="")
+    monkeypatch.setattr(output_class, "write", write)
+    assert checkpoints.load(checkpoints.path_for(path))["events"] == 2000
+
+    assert generate_archive(path, fmt, resume=True) == 5000
+    assert read(path) == read(expected)
+
+class FailingCsvSink(generate_ticket_users.CsvSink):
+    def write_batch(self, batch, rows):
+        if batch["user_id"][0] > 200:
+            self.file.write("partial")
+            raise Interrupted()
+        super().write_batch(batch, rows)
+
+def test_users_resume_is_byte_identical(tmp_path):
+    expected = str(tmp_path / "expected.csv")
+    generate_ticket_users.run_pipeline([generate_ticket_users.CsvSink(expected)], num_users=500, batch_size=100)
+
+    path = str(tmp_path / "users.csv")
+    checkpoint = str(tmp_path / "users.checkpoint")
+    with pytest.raises(Interrupted):
+        generate_ticket_users.run_pipeline([FailingCsvSink(path)], num_users=500, batch_size=100,
+                                           checkpoint_path=checkpoint)
+    state = checkpoints.load(checkpoint)
+    assert state["next_id"] == 201
+
+    generate_ticket_users.run_pipeline([generate_ticket_users.CsvSink(path)], num_users=500, batch_size=100,
+                                       checkpoint_path=checkpoint, resume_state=state)
+    assert read(path) == read(expected)
+    assert checkpoints.load(checkpoint)["complete"]
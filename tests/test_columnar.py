@@ -0,0 +1,34 @@
+import filecmp
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import columnar
+from events_archive import EventsArchiveGenerator
+
+def write(path, chunks):
+    with columnar.ColumnarWriter(path, columnar.EVENTS_SCHEMA) as writer:
+        for columns in chunks:
+            writer.append(columns)
+
+def test_encoded_categories_match_strings(tmp_path):
+    generator = EventsArchiveGenerator(3)
+    batches = [generator.generate_batch(100_000 + i * 500, 500, datetime(2020, 1, 1), datetime(2024, 12, 31))
+               for i in range(3)]
+    write(str(tmp_path / "strings"), [columnar.event_columns(batch.to_dicts()) for batch in batches])
+    write(str(tmp_path / "codes"), [batch.columns() for batch in batches])
+
+    names = sorted(os.listdir(tmp_path / "strings"))
+    assert names == sorted(os.listdir(tmp_path / "codes"))
+    assert filecmp.cmpfiles(tmp_path / "strings", tmp_path / "codes", names, shallow=False)[0] == names
+    dataset = columnar.ColumnarDataset(str(tmp_path / "codes"))
+    assert dataset[700]["provider"] == batches[1].to_dicts()[200]["provider"]
+
+def test_encoded_categories_respect_dtype_limit(tmp_path):
+    schema = [("kind", columnar.CATEGORY, "|u1")]
+    categories = [f"c{i}" for i in range(300)]
+    with pytest.raises(ValueError, match="more than 256 categories"):
+        with columnar.ColumnarWriter(str(tmp_path / "kinds"), schema) as writer:
+            writer.append({"kind": columnar.CategoryCodes(np.arange(300), categories)})
@@ -0,0 +1,44 @@
+import contextlib
+import io
+
+import pytest
+
+import generate_events
+import insert_events_from_json
+from events_archive import EventsArchiveGenerator, write_archive
+
+def serial_rows(path):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        insert_events_from_json.generate_copy_data(insert_events_from_json.iter_events(path))
+    return [line for line in out.getvalue().splitlines() if line[:1].isdigit()]
+
+def split_rows(path, pattern, files):
+    results = insert_events_from_json.write_split(path, "copy", 1000, files, pattern, jobs=1)
+    rows = []
+    for result in results:
+        with open(result["file"], encoding="utf-8") as f:
+            rows.extend(line for line in f.read().splitlines() if line[:1].isdigit())
+    return results, rows
+
+@pytest.fixture
+def indented_events(tmp_path):
+    path = str(tmp_path / "events.json")
+    generate_events.save_events(generate_events.generate_events(count=100), path)
+    return path
+
+@pytest.mark.parametrize("fmt,indent", [("jsonl", None), ("json", None), ("json", 2)])
+def test_split_matches_serial_archive(tmp_path, fmt, indent):
+    path = str(tmp_path / f"archive.{fmt}")
+    write_archive(EventsArchiveGenerator(), path, fmt, 1000, 2024, 2024, 7, 1, indent)
+    results, rows = split_rows(path, str(tmp_path / "out" / "events.sql"), 3)
+    assert sum(result["rows"] for result in results) == 1000
+    assert rows == serial_rows(path)
+
+def test_indented_events_are_not_indexed(indented_events):
+    assert insert_events_from_json.index_event_lines(indented_events) is None
+
+def test_split_matches_serial_indented_events(tmp_path, indented_events):
+    results, rows = split_rows(indented_events, str(tmp_path / "events.sql"), 3)
+    assert [result["rows"] for result in results] == [33, 33, 34]
+    assert rows == serial_rows(indented_events)
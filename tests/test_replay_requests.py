@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import json
+from collections import Counter
+
+import numpy as np
+
+import generate_requests
+import generate_ticket_users
+import replay_requests
+
+def write_requests(tmp_path, sessions=50):
+    users = str(tmp_path / "users.csv")
+    generate_ticket_users.run_pipeline([generate_ticket_users.CsvSink(users)], num_users=200)
+    rng = np.random.default_rng(1)
+    pool = generate_requests.EventPool(np.arange(1, 101, dtype=np.int64), None, 1.1, rng)
+    path = str(tmp_path / "requests.jsonl")
+    with open(path, "w", encoding="utf-8") as out:
+        generate_requests.generate_requests(out, pool, generate_requests.Credentials(users), rng, "constant",
+                                            100.0, 5.0, 60.0, 0.01, 0.5, 0.7, sessions)
+    return path
+
+def replay(path, **options):
+    args = dict(url=None, stub=True, rps=5000.0, speed=1.0, connections=8, max_in_flight=64, timeout=5.0,
+                limit=None, requests=path)
+    args.update(options)
+    return asyncio.run(replay_requests.replay(argparse.Namespace(**args)))
+
+def test_histogram_percentiles():
+    histogram = replay_requests.Histogram()
+    for value in range(1, 100_001):
+        histogram.record(value)
+    assert histogram.total == 100_000
+    for p in (50, 99, 99.9):
+        assert abs(histogram.percentile(p) - 1000 * p) <= 1000 * p * 0.02
+    assert histogram.percentile(100) == histogram.max == 100_000
+
+def test_replay_against_stub(tmp_path):
+    path = write_requests(tmp_path)
+    with open(path, encoding="utf-8") as f:
+        types = Counter(json.loads(line)["type"] for line in f)
+
+    report = replay(path)
+    overall = report["overall"]
+    assert overall["requests"] == sum(types.values())
+    assert overall["errors"] == 0
+    assert overall["statuses"] == {"200": sum(types.values())}
+    assert {key: stats["requests"] for key, stats in report["endpoints"].items()} == dict(types)
+    assert 0 < overall["p50_ms"] <= overall["p99_ms"] <= overall["p999_ms"] <= overall["max_ms"]
+
+def test_replay_limit(tmp_path):
+    report = replay(write_requests(tmp_path, sessions=10), limit=7)
+    assert report["overall"]["requests"] == 7
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Precompiled event title tables with index-based sampling.
+
+Every possible title (event type x template x fill-ins) is expanded once into
+an interned string table. Titles are then sampled as integer codes in bulk,
+so generating an event no longer formats and discards candidate strings, and
+the codes can be stored directly as a dictionary-encoded column.
+
+Sampling matches picking a template uniformly and then each fill-in
+uniformly: the template is drawn first, then one of its expansions.
+"""
+import itertools
+import string
+import sys
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+_formatter = string.Formatter()
+
+def template_fields(template: str) -> List[str]:
+    """Named fields of a str.format template, in order of first use"""
+    fields = []
+    for _, field, _, _ in _formatter.parse(template):
+        if field and field not in fields:
+            fields.append(field)
+    return fields
+
+class TitleTable:
+    """Interned titles grouped by event type and template"""
+
+    def __init__(self):
+        self.titles: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._groups: Dict[str, List[List[int]]] = {}
+        self._compiled = None
+
+    def code(self, title: str) -> int:
+        """Code of a title, adding it to the table if needed"""
+        code = self._codes.get(title)
+        if code is None:
+            code = self._codes[title] = len(self.titles)
+            self.titles.append(sys.intern(title))
+        return code
+
+    def add_group(self, event_type: str, titles: Iterable[str]) -> None:
+        """Add the expansions of one template; each group is equally likely within its type"""
+        self._groups.setdefault(event_type, []).append([self.code(title) for title in titles])
+        self._compiled = None
+
+    def add_template(self, event_type: str, template: str, **choices: Sequence[str]) -> None:
+        """Add a template with named fields expanded over every combination of choices"""
+        fields = template_fields(template)
+        self.add_group(event_type, (template.format(**dict(zip(fields, values)))
+                                    for values in itertools.product(*(choices[field] for field in fields))))
+
+    def _compile(self, event_types: Sequence[str]):
+        # Flat arrays: per type its first group and group count, per group its
+        # first position in the flat code array and its size
+        type_first_group, type_group_count, group_start, group_size, codes = [], [], [], [], []
+        for event_type in event_types:
+            groups = self._groups[event_type]
+            type_first_group.append(len(group_start))
+            type_group_count.append(len(groups))
+            for group in groups:
+                group_start.append(len(codes))
+                group_size.append(len(group))
+                codes.extend(group)
+        self._compiled = (tuple(event_types), np.array(type_first_group), np.array(type_group_count),
+                          np.array(group_start), np.array(group_size), np.array(codes, dtype=np.int32))
+        return self._compiled
+
+    def sample(self, rng, event_types: Sequence[str], type_index: np.ndarray) -> np.ndarray:
+        """Draw one title code per element of type_index (indices into event_types)"""
+        compiled = self._compiled
+        if compiled is None or compiled[0] != tuple(event_types):
+            compiled = self._compile(event_types)
+        _, type_first_group, type_group_count, group_start, group_size, codes = compiled
+        
+        count = len(type_index)
+        group = type_first_group[type_index] + (rng.random(count) * type_group_count[type_index]).astype(np.int64)
+        position = group_start[group] + (rng.random(count) * group_size[group]).astype(np.int64)
+        return codes[position]
+
+    def lookup(self, codes: np.ndarray) -> List[str]:
+        """Title strings for an array of codes"""
+        titles = self.titles
+        return [titles[code] for code in codes.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.titles)
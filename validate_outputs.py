@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Streaming validator for generated events, archive and users files.
+
+Checks what the database constraints would reject, and a few things they
+would not, before a load is started:
+
+- IDs are in range, strictly increasing and unique. Upcoming events
+  (generate_events.py) and the archive (events_archive.py) share one ID
+  space, so a collision between the two files is reported too.
+- Emails are unique.
+- Dates parse and are ordered (last_logged_in >= registered_at, nothing
+  after the --now anchor, events inside their generation window).
+- Enum columns (event type, provider, is_active) hold known values.
+
+Files are read in batches and checked with NumPy, so memory does not grow
+with the file: integer IDs are kept in a bitmap (one bit per possible ID,
+about 0.8 MB for the 6M-event archive) and emails as 64-bit hashes (8 bytes
+per user). Hash matches are confirmed by re-reading the file for the few
+emails involved, so a hash collision never shows up as a false duplicate.
+
+    python3 validate_outputs.py --events events.json --archive events_archive.jsonl.gz --users users.csv
+
+Files generated with --scale or --config take the same options here, which
+set the expected ID ranges, archive years and --now anchor.
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import csv
+import sys
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import compression
+import datetime_sampling
+import generate_events
+import generate_ticket_users
+import instrumentation
+import profiles
+from events_archive import ARCHIVE_ID_START, EventsArchiveGenerator
+from insert_events_from_json import EVENT_COLUMNS, iter_batches, iter_events
+
+BATCH_SIZE = 100_000
+
+# Largest value of a PostgreSQL INTEGER column
+MAX_INT4 = 2 ** 31 - 1
+
+class Report:
+    """Number of values checked and failed per named check, with a few failing examples"""
+
+    def __init__(self, max_examples: int = 5):
+        self.max_examples = max_examples
+        self.checks: Dict[str, List] = {}
+
+    def check(self, name: str, values: Sequence, bad: np.ndarray) -> None:
+        """Record one batch of a check; bad is a boolean mask over values"""
+        entry = self.checks.setdefault(name, [0, 0, []])
+        entry[0] += len(bad)
+        failed = int(np.count_nonzero(bad))
+        if failed:
+            entry[1] += failed
+            room = self.max_examples - len(entry[2])
+            if room > 0:
+                entry[2].extend(values[i] for i in np.flatnonzero(bad)[:room].tolist())
+
+    def fail(self, name: str, examples: Sequence) -> None:
+        """Record failures found outside a batch (e.g. confirmed duplicate emails)"""
+        entry = self.checks.setdefault(name, [0, 0, []])
+        entry[1] += len(examples)
+        entry[2].extend(examples[:max(0, self.max_examples - len(entry[2]))])
+
+    @property
+    def ok(self) -> bool:
+        return all(failed == 0 for _, failed, _ in self.checks.values())
+
+    def print(self, stream=sys.stdout) -> None:
+        width = max((len(name) for name in self.checks), default=0)
+        for name, (checked, failed, examples) in self.checks.items():
+            status = "ok" if failed == 0 else f"FAILED {failed:,}"
+            print(f"{name:<{width}}  {checked:>12,}  {status}", file=stream)
+            for example in examples:
+                print(f"{'':<{width}}    e.g. {example!r}", file=stream)
+
+class IdBitmap:
+    """Set of non-negative integer IDs stored as one bit per possible ID"""
+
+    def __init__(self):
+        self.bits = np.zeros(0, dtype=np.uint8)
+
+    def add(self, ids: np.ndarray) -> np.ndarray:
+        """Add ids, returning a mask of those already present (earlier or in this batch)"""
+        if len(ids) == 0:
+            return np.zeros(0, dtype=bool)
+        needed = int(ids.max()) // 8 + 1
+        if needed > len(self.bits):
+            grown = np.zeros(max(needed, 2 * len(self.bits)), dtype=np.uint8)
+            grown[:len(self.bits)] = self.bits
+            self.bits = grown
+
+        byte = ids >> 3
+        mask = (1 << (ids & 7)).astype(np.uint8)
+        seen = (self.bits[byte] & mask) != 0
+
+        # Repeats inside the batch: every occurrence after the first
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        repeated = np.zeros(len(ids), dtype=bool)
+        repeated[order[1:]] = sorted_ids[1:] == sorted_ids[:-1]
+
+        np.bitwise_or.at(self.bits, byte, mask)
+        return seen | repeated
+
+class HashedStrings:
+    """64-bit hashes of a stream of strings, for finding duplicates without keeping the strings"""
+
+    def __init__(self):
+        self.chunks: List[np.ndarray] = []
+
+    def add(self, values: Sequence[str]) -> None:
+        self.chunks.append(np.fromiter(map(hash, values), dtype=np.int64, count=len(values)))
+
+    def repeated_hashes(self) -> set:
+        """Hashes seen more than once; duplicates are among the strings with these hashes"""
+        if not self.chunks:
+            return set()
+        hashes = np.sort(np.concatenate(self.chunks))
+        self.chunks = []
+        return set(np.unique(hashes[1:][hashes[1:] == hashes[:-1]]).tolist())
+
+def parse_datetimes(values: Sequence[str], unit: str = "s") -> Tuple[np.ndarray, np.ndarray]:
+    """values as datetime64 (NaT for empty strings) and a mask of values that do not parse"""
+    try:
+        return np.array(values, dtype=f"datetime64[{unit}]"), np.zeros(len(values), dtype=bool)
+    except ValueError:
+        pass
+    parsed = np.empty(len(values), dtype=f"datetime64[{unit}]")
+    invalid = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            parsed[i] = np.datetime64(value, unit)
+        except ValueError:
+            parsed[i] = np.datetime64("NaT")
+            invalid[i] = True
+    return parsed, invalid
+
+def check_ids(report: Report, label: str, ids: np.ndarray, low: int, high: int,
+              previous: Optional[int], bitmap: IdBitmap, unique_check: str) -> None:
+    """Range, strictly increasing order (continuing from previous) and uniqueness of one batch of IDs"""
+    values = ids.tolist()
+    in_range = (ids >= low) & (ids <= high)
+    report.check(f"{label}: id in [{low:,}, {high:,}]", values, ~in_range)
+    before = np.concatenate(([previous], ids[:-1])) if previous is not None else np.r_[ids[:1] - 1, ids[:-1]]
+    report.check(f"{label}: id increasing", values, ids <= before)
+    # Out-of-range IDs stay out of the bitmap so one bad value cannot blow up its size
+    duplicate = np.zeros(len(ids), dtype=bool)
+    duplicate[in_range] = bitmap.add(ids[in_range])
+    report.check(unique_check, values, duplicate)
+
+def check_enum(report: Report, name: str, values: Sequence, allowed: Sequence) -> None:
+    allowed = set(allowed)
+    report.check(f"{name} known", values, np.array([value not in allowed for value in values]))
+
+def validate_events(path: str, label: str, report: Report, bitmap: IdBitmap, id_range: Tuple[int, int],
+                    types: Sequence[str], providers: Sequence[str], window: Tuple[np.datetime64, np.datetime64],
+                    batch_size: int = BATCH_SIZE) -> int:
+    """Check one events file (JSON, JSONL or columnar, possibly compressed), returning its event count"""
+    count = 0
+    previous = None
+    for batch in iter_batches(iter_events(path), batch_size):
+        with instrumentation.stage("check"):
+            report.check(f"{label}: fields", batch,
+                         np.array([len(event) != len(EVENT_COLUMNS) or any(name not in event for name in EVENT_COLUMNS)
+                                   for event in batch]))
+            ids = np.array([event.get("id", -1) for event in batch], dtype=np.int64)
+            # Upcoming and archive events share the bitmap, so collisions between files count too
+            check_ids(report, label, ids, id_range[0], id_range[1], previous, bitmap, "events: id unique")
+            previous = int(ids[-1])
+
+            for name in ("title", "description"):
+                values = [event.get(name) for event in batch]
+                report.check(f"{label}: {name} non-empty", values,
+                             np.array([not isinstance(value, str) or not value for value in values]))
+            check_enum(report, f"{label}: type", [event.get("type") for event in batch], types)
+            check_enum(report, f"{label}: provider", [event.get("provider") for event in batch], providers)
+
+            starts = [event.get("datetime_start") or "" for event in batch]
+            parsed, invalid = parse_datetimes(starts)
+            report.check(f"{label}: datetime_start valid", starts, invalid | np.isnat(parsed))
+            outside = ~np.isnat(parsed) & ((parsed < window[0]) | (parsed >= window[1]))
+            report.check(f"{label}: datetime_start in [{window[0]}, {window[1]})", starts, outside)
+        count += len(batch)
+        instrumentation.advance(len(batch))
+    return count
+
+def iter_user_rows(path: str, batch_size: int) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """(header, rows) batches of a users CSV file"""
+    with compression.open_input(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        while True:
+            with instrumentation.stage("read"):
+                rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            yield header, rows
+
+def validate_users(path: str, report: Report, now: np.datetime64, batch_size: int = BATCH_SIZE,
+                   id_start: int = 1) -> int:
+    """Check a users CSV file (possibly compressed), returning its row count"""
+    fields = generate_ticket_users.FIELDNAMES
+    column = {name: i for i, name in enumerate(fields)}
+    bitmap = IdBitmap()
+    emails = HashedStrings()
+    count = 0
+    previous = None
+    for header, rows in iter_user_rows(path, batch_size):
+        if count == 0:
+            report.check("users: header", [header], np.array([header != fields]))
+        with instrumentation.stage("check"):
+            short = np.array([len(row) != len(fields) for row in rows])
+            report.check(f"users: {len(fields)} columns", rows, short)
+            rows = [row for row in rows if len(row) == len(fields)]
+            if not rows:
+                continue
+            values = {name: [row[i] for row in rows] for name, i in column.items()}
+
+            ids = np.array([int(value) if value.isdigit() else -1 for value in values["user_id"]], dtype=np.int64)
+            check_ids(report, "users", ids, id_start, MAX_INT4, previous, bitmap, "users: user_id unique")
+            previous = int(ids[-1])
+
+            email = values["email"]
+            report.check("users: email has one @", email,
+                         np.array([value.count("@") != 1 or value.startswith("@") or value.endswith("@")
+                                   for value in email]))
+            emails.add(email)
+            report.check("users: password_hash non-empty", values["password_hash"],
+                         np.array([not value for value in values["password_hash"]]))
+            check_enum(report, "users: is_active", values["is_active"], ("True", "False"))
+
+            birthday, invalid = parse_datetimes(values["birthday"], "D")
+            report.check("users: birthday valid or empty", values["birthday"], invalid)
+            report.check(f"users: birthday <= {now.astype('datetime64[D]')}", values["birthday"],
+                         ~np.isnat(birthday) & (birthday > now.astype("datetime64[D]")))
+
+            registered, invalid_registered = parse_datetimes(values["registered_at"])
+            logged_in, invalid_logged_in = parse_datetimes(values["last_logged_in"])
+            report.check("users: registered_at valid", values["registered_at"],
+                         invalid_registered | np.isnat(registered))
+            report.check("users: last_logged_in valid", values["last_logged_in"],
+                         invalid_logged_in | np.isnat(logged_in))
+            pairs = list(zip(values["registered_at"], values["last_logged_in"]))
+            report.check("users: last_logged_in >= registered_at", pairs, logged_in < registered)
+            report.check(f"users: last_logged_in <= {now}", values["last_logged_in"], logged_in > now)
+        count += len(rows)
+        instrumentation.advance(len(rows))
+
+    # Second pass only over the emails whose hashes repeat, to confirm real duplicates
+    with instrumentation.stage("emails"):
+        candidates = emails.repeated_hashes()
+        seen: Dict[str, str] = {}
+        duplicates = []
+        if candidates:
+            index = column["email"]
+            for _, rows in iter_user_rows(path, batch_size):
+                for row in rows:
+                    if len(row) == len(fields) and hash(row[index]) in candidates:
+                        if row[index] in seen:
+                            duplicates.append((row[index], seen[row[index]], row[column["user_id"]]))
+                        else:
+                            seen[row[index]] = row[column["user_id"]]
+        report.check("users: email unique", [], np.zeros(count, dtype=bool))
+        if duplicates:
+            report.fail("users: email unique", duplicates)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate generated events, archive and users files")
+    parser.add_argument("--events", help="upcoming events from generate_events.py")
+    parser.add_argument("--archive", help="archive from events_archive.py (JSON, JSONL or columnar, optionally .gz/.zst)")
+    parser.add_argument("--users", help="users CSV from generate_ticket_users.py (optionally .gz/.zst)")
+    parser.add_argument("--now", default=None, help="the anchor the files were generated with (default: the fixed anchor)")
+    parser.add_argument("--start-year", type=int, default=None, help="first year of the archive (default 2015)")
+    parser.add_argument("--end-year", type=int, default=None, help="last year of the archive (default 2024)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-examples", type=int, default=5, help="failing values to show per check")
+    instrumentation.add_arguments(parser)
+    profiles.add_arguments(parser, dry_run=False)
+    args = parser.parse_args()
+    if not (args.events or args.archive or args.users):
+        parser.error("give at least one of --events, --archive and --users")
+    config = profiles.load_config(args.config) if args.config else None
+    events_settings, archive_settings, users_settings = (profiles.settings(section, args.scale, config)
+                                                          for section in ("events", "archive", "users"))
+    archive_id_start = archive_settings.get("id_start", ARCHIVE_ID_START)
+    start_year = args.start_year or archive_settings.get("start_year", 2015)
+    end_year = args.end_year or archive_settings.get("end_year", 2024)
+
+    # Each generator has its own --now anchor in a profile or config
+    today = datetime_sampling.now_anchor(args.now or events_settings.get("now")).astype("datetime64[D]")
+    users_now = datetime_sampling.now_anchor(args.now or users_settings.get("now"))
+    report = Report(args.max_examples)
+    event_ids = IdBitmap()
+    archive = EventsArchiveGenerator()
+
+    with instrumentation.profiled(args.profile), instrumentation.tracker_from_args(args, "validate"):
+        if args.events:
+            count = validate_events(args.events, "events", report, event_ids,
+                                    (events_settings.get("id_start", 1), archive_id_start - 1),
+                                    generate_events.EVENT_TYPES, generate_events.PROVIDERS,
+                                    (today + 1, today + 1 + generate_events.EVENT_WINDOW_DAYS), args.batch_size)
+            print(f"Checked {count:,} events in {args.events}", file=sys.stderr)
+        if args.archive:
+            window = (np.datetime64(f"{start_year}-01-01"), np.datetime64(f"{end_year + 1}-01-01"))
+            count = validate_events(args.archive, "archive", report, event_ids, (archive_id_start, MAX_INT4),
+                                    archive.event_types, archive.providers, window, args.batch_size)
+            print(f"Checked {count:,} archive events in {args.archive}", file=sys.stderr)
+        if args.users:
+            count = validate_users(args.users, report, users_now, args.batch_size, users_settings.get("id_start", 1))
+            print(f"Checked {count:,} users in {args.users}", file=sys.stderr)
+
+    report.print()
+    if not report.ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Random-access virtual datasets backed by a counter-based generator.
+
+Every row is a pure function of (seed, row index): row r draws its random
+numbers from the Philox counter block starting at r * width / 4 (each Philox
+counter value gives four 64-bit outputs), so any row or contiguous range can
+be generated directly, without producing the rows before it or touching disk:
+
+    events = VirtualEvents(seed=42)
+    events[4_500_000]                    # one event, O(1)
+    events[1000:2000]                    # a range, one vectorized draw
+    users = VirtualUsers(seed=42)
+    users.get(123_456)                   # by user ID
+    VirtualEvents.from_profile("ci")     # counts, seed, years and IDs of a scale profile
+
+Rows reuse the regular generators (EventsArchiveGenerator.generate_range and
+generate_users_batch), so they have the same fields and distributions as the
+files those produce, but not the same values: the file generators consume one
+sequential stream. Shards of a virtual dataset are independent by construction
+and can be generated in any process in any order.
+"""
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+import datetime_sampling
+import profiles
+from events_archive import ARCHIVE_ID_START, EventsArchiveGenerator
+
+# Stream numbers, so events and users with the same seed use different keys
+EVENTS_STREAM = 1
+USERS_STREAM = 2
+
+# Random numbers drawn per row; a multiple of 4, as Philox produces four per counter
+EVENT_WIDTH = 8
+USER_WIDTH = 28
+
+def philox_key(seed: int, stream: int) -> int:
+    """128-bit Philox key combining a 64-bit seed with a stream number"""
+    return (stream << 64) | (seed & (2 ** 64 - 1))
+
+class RowDraws:
+    """Stands in for a NumPy Generator while sampling rows [start, stop)
+
+    Each row owns `width` uniforms from its own counter block. Every call
+    (random, integers, choice) takes the next column of them, so a row's values
+    depend only on its index and not on which range it was generated in.
+    """
+
+    def __init__(self, key: int, start: int, stop: int, width: int):
+        if width % 4:
+            raise ValueError("width must be a multiple of 4")
+        count = stop - start
+        raw = np.random.Philox(key=key, counter=start * width // 4).random_raw(count * width)
+        # Top 53 bits as a double in [0, 1)
+        self.uniforms = ((raw >> np.uint64(11)) * (1.0 / 2 ** 53)).reshape(count, width)
+        self.count = count
+        self.next_column = 0
+
+    def _take(self, size) -> np.ndarray:
+        columns = 1 if isinstance(size, (int, np.integer)) else int(np.prod(size[1:]))
+        if self.next_column + columns > self.uniforms.shape[1]:
+            raise ValueError(f"Rows need more than {self.uniforms.shape[1]} random numbers")
+        values = self.uniforms[:, self.next_column:self.next_column + columns]
+        self.next_column += columns
+        return values[:, 0] if columns == 1 and isinstance(size, (int, np.integer)) else values.reshape(size)
+
+    def _check(self, size) -> None:
+        rows = size if isinstance(size, (int, np.integer)) else size[0]
+        if rows != self.count:
+            raise ValueError(f"Expected one draw per row ({self.count}), got size {size}")
+
+    def random(self, size) -> np.ndarray:
+        self._check(size)
+        return self._take(size)
+
+    def integers(self, low, high=None, size=None) -> np.ndarray:
+        if high is None:
+            low, high = 0, low
+        self._check(size)
+        u = self._take(size)
+        low = np.asarray(low)
+        return low + (u * (np.asarray(high) - low)).astype(np.int64)
+
+    def choice(self, a, size, p: Optional[Sequence[float]] = None) -> np.ndarray:
+        self._check(size)
+        a = np.asarray(a)
+        u = self._take(size)
+        if p is None:
+            return a[(u * len(a)).astype(np.int64)]
+        cumulative = np.cumsum(p)
+        return a[np.minimum(np.searchsorted(cumulative / cumulative[-1], u, side="right"), len(a) - 1)]
+
+class VirtualDataset:
+    """Sequence of generated rows; subclasses implement rows(start, stop)"""
+
+    # profiles section and the settings of it that __init__ takes
+    section = ""
+    settings = ("seed", "count")
+
+    def __init__(self, seed: int, count: int):
+        self.seed = seed
+        self.count = count
+
+    @classmethod
+    def from_profile(cls, profile: Optional[str] = None, config: Optional[Dict] = None) -> "VirtualDataset":
+        """The dataset a scale profile and/or loaded --config file describe"""
+        chosen = profiles.settings(cls.section, profile, config)
+        return cls(**{key: value for key, value in chosen.items() if key in cls.settings})
+
+    def __len__(self) -> int:
+        return self.count
+
+    def rows(self, start: int, stop: int) -> List[Dict]:
+        raise NotImplementedError
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step == 1:
+                return self.rows(start, max(start, stop))
+            return [self.rows(i, i + 1)[0] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"row {index} out of range for {self.count} rows")
+        return self.rows(index, index + 1)[0]
+
+    def iter_batches(self, batch_size: int = 100_000, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Dict]]:
+        stop = self.count if stop is None else min(stop, self.count)
+        for offset in range(start, stop, batch_size):
+            yield self.rows(offset, min(offset + batch_size, stop))
+
+class VirtualEvents(VirtualDataset):
+    """Archive events; row i has ID id_start + i"""
+
+    section = "archive"
+    settings = ("seed", "count", "start_year", "end_year", "id_start")
+
+    def __init__(self, seed: int = 0, count: int = 6_000_000, start_year: int = 2015, end_year: int = 2024,
+                 id_start: int = ARCHIVE_ID_START):
+        super().__init__(seed, count)
+        self.generator = EventsArchiveGenerator(archive_id_start=id_start)
+        self.first_id = id_start
+        self.start_date = datetime(start_year, 1, 1)
+        self.end_date = datetime(end_year, 12, 31)
+        self.key = philox_key(seed, EVENTS_STREAM)
+
+    def rows(self, start: int, stop: int) -> List[Dict]:
+        self.generator.rng = RowDraws(self.key, start, stop, EVENT_WIDTH)
+        return self.generator.generate_range(self.first_id + start, stop - start, self.start_date, self.end_date)
+
+    def get(self, event_id: int) -> Dict:
+        return self[event_id - self.first_id]
+
+class VirtualUsers(VirtualDataset):
+    """Users as in users.csv; row i has user_id id_start + i"""
+
+    section = "users"
+    settings = ("seed", "count", "now", "id_start")
+
+    def __init__(self, seed: int = 0, count: int = 1_000_000, now=None, id_start: int = 1):
+        super().__init__(seed, count)
+        self.now = datetime_sampling.now_anchor(now)
+        self.first_id = id_start
+        self.key = philox_key(seed, USERS_STREAM)
+
+    def rows(self, start: int, stop: int) -> List[Dict]:
+        # Imported here because it loads the name tables on import
+        import generate_ticket_users as users
+
+        batch = users.generate_users_batch(RowDraws(self.key, start, stop, USER_WIDTH), self.first_id + start,
+                                           stop - start, self.now)
+        return [dict(zip(users.FIELDNAMES, row)) for row in users.batch_rows(batch)]
+
+    def get(self, user_id: int) -> Dict:
+        return self[user_id - self.first_id]